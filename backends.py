@@ -0,0 +1,350 @@
+# backends.py
+"""
+Search backends used by MusicSearchService.
+
+YTMusicBackend talks to YouTube Music. The others let the search pipeline
+run without a network: FakeBackend answers in-process, StubServer serves
+the same responses over loopback HTTP for HttpStubBackend, and
+RecordingBackend captures real responses to replay later.
+
+Run a stub server from the repository root:
+    python -m backends serve [RECORDING] [--port 8765] [--latency 0.2] [--jitter 0.05]
+Record real responses for it:
+    python -m backends record RECORDING QUERY [QUERY ...]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from ytmusicapi import YTMusic
+
+from config import Config
+
+
+class SearchBackend(ABC):
+    """Returns raw ytmusicapi-shaped result dicts for a search."""
+
+    @abstractmethod
+    def search(self, query: str, filter: str, limit: int) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def get_tracks(self, kind: str, browse_id: str) -> List[dict]:
+        """Returns the song items of an album, artist or playlist."""
+
+    def close(self):
+        """Releases any connections held by the backend."""
+
+
+class YTMusicBackend(SearchBackend):
+    """
+    Searches YouTube Music. One YTMusic client is shared by every search,
+    backed by a keep-alive requests.Session, so only the first search pays
+    for client setup and TLS handshakes.
+    """
+    HTTP_POOL_SIZE = 10
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or create_session(self.HTTP_POOL_SIZE)
+        self._client: Optional[YTMusic] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> YTMusic:
+        """The shared YTMusic client, created on first use."""
+        # Unauthenticated YTMusic keeps no per-request state, so one
+        # instance can serve concurrent searches from worker threads.
+        with self._client_lock:
+            if self._client is None:
+                self._client = YTMusic(requests_session=self.session)
+            return self._client
+
+    def search(self, query: str, filter: str, limit: int) -> List[dict]:
+        return self.client.search(query=query, filter=filter, limit=limit)
+
+    def get_tracks(self, kind: str, browse_id: str) -> List[dict]:
+        if kind == "album":
+            album = self.client.get_album(browse_id)
+            # Album tracks carry the album title as a plain string; reshape it like search items.
+            return [dict(track, album={"name": album["title"], "id": browse_id}) for track in album.get("tracks", [])]
+        if kind == "playlist":
+            return self.client.get_playlist(browse_id, limit=None).get("tracks", [])
+        if kind == "artist":
+            songs = self.client.get_artist(browse_id).get("songs") or {}
+            if songs.get("browseId"):
+                # The full list of an artist's songs is exposed as a playlist.
+                return self.client.get_playlist(songs["browseId"], limit=None).get("tracks", [])
+            return songs.get("results", [])
+        raise ValueError(f"Unknown collection kind '{kind}'.")
+
+    def close(self):
+        self.session.close()
+
+
+class FakeBackend(SearchBackend):
+    """
+    Answers searches in-process. Queries found in 'recording' are replayed
+    from it; any other query gets synthetic songs derived from the query
+    text, so the same query always returns the same results. 'latency' and
+    'jitter' (seconds) simulate the network, drawn from a seeded generator.
+    """
+    def __init__(self, recording: Optional[Dict[str, List[dict]]] = None,
+                 latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.recording = recording or {}
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def search(self, query: str, filter: str, limit: int) -> List[dict]:
+        self._sleep()
+        items = self.recording.get(recording_key(query, filter))
+        if items is None:
+            if filter == "songs":
+                items = synthetic_items(query, limit)
+            else:
+                items = synthetic_collections(query, filter, limit)
+        return items[:limit]
+
+    def get_tracks(self, kind: str, browse_id: str) -> List[dict]:
+        self._sleep()
+        items = self.recording.get(recording_key(browse_id, kind))
+        if items is None:
+            items = synthetic_items(browse_id, 12)
+        return items
+
+    def _sleep(self):
+        if not self.latency and not self.jitter:
+            return
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, delay))
+
+
+class RecordingBackend(SearchBackend):
+    """Forwards searches to another backend and keeps the responses for save()."""
+    def __init__(self, backend: SearchBackend):
+        self.backend = backend
+        self.recording: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def search(self, query: str, filter: str, limit: int) -> List[dict]:
+        items = self.backend.search(query, filter, limit)
+        with self._lock:
+            self.recording[recording_key(query, filter)] = items
+        return items
+
+    def get_tracks(self, kind: str, browse_id: str) -> List[dict]:
+        items = self.backend.get_tracks(kind, browse_id)
+        with self._lock:
+            self.recording[recording_key(browse_id, kind)] = items
+        return items
+
+    def save(self, path: str):
+        with self._lock:
+            save_recording(path, self.recording)
+
+    def close(self):
+        self.backend.close()
+
+
+class StubServer:
+    """
+    A loopback HTTP server that answers POST /search and POST /tracks with
+    a FakeBackend, for benchmarking the search pipeline including its HTTP
+    overhead.
+    """
+    def __init__(self, backend: FakeBackend, host: str = "127.0.0.1", port: int = 0):
+        self.backend = backend
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="search-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/tracks":
+                    items = backend.get_tracks(request["kind"], request["browse_id"])
+                else:
+                    items = backend.search(request["query"], request.get("filter", "songs"), request.get("limit", 20))
+                body = json.dumps(items).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class HttpStubBackend(SearchBackend):
+    """Searches against a StubServer over a pooled keep-alive session."""
+    def __init__(self, url: str, pool_size: int = YTMusicBackend.HTTP_POOL_SIZE):
+        self.url = url.rstrip("/")
+        self.session = create_session(pool_size)
+
+    def search(self, query: str, filter: str, limit: int) -> List[dict]:
+        response = self.session.post(
+            f"{self.url}/search", json={"query": query, "filter": filter, "limit": limit}, timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_tracks(self, kind: str, browse_id: str) -> List[dict]:
+        response = self.session.post(
+            f"{self.url}/tracks", json={"kind": kind, "browse_id": browse_id}, timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """A session whose connection pool fits one connection per search worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_backend(config: Config) -> SearchBackend:
+    """Builds the backend selected by Config.SEARCH_BACKEND."""
+    if config.SEARCH_BACKEND == "ytmusic":
+        return YTMusicBackend()
+    if config.SEARCH_BACKEND == "fake":
+        recording = load_recording(config.SEARCH_RECORDING_FILENAME) if config.SEARCH_RECORDING_FILENAME else None
+        return FakeBackend(recording)
+    if config.SEARCH_BACKEND == "stub":
+        return HttpStubBackend(config.SEARCH_STUB_URL)
+    raise ValueError(f"Unknown search backend '{config.SEARCH_BACKEND}'. Use ytmusic, fake or stub.")
+
+
+def recording_key(query: str, filter: str) -> str:
+    return f"{filter}:{' '.join(query.casefold().split())}"
+
+
+def load_recording(path: str) -> Dict[str, List[dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_recording(path: str, recording: Dict[str, List[dict]]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recording, f, indent=1, ensure_ascii=False)
+
+
+def synthetic_items(query: str, count: int) -> List[dict]:
+    """Song results shaped like ytmusicapi's, stable for a given query."""
+    rng = random.Random(zlib.crc32(" ".join(query.casefold().split()).encode("utf-8")))
+    items = []
+    for i in range(count):
+        video_id = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_") for _ in range(11))
+        artists = [{"name": f"Artist {rng.randrange(500)}", "id": f"UC{rng.randrange(10**8):08d}"}
+                   for _ in range(rng.choice((1, 1, 1, 2, 3)))]
+        album = None if rng.random() < 0.2 else {"name": f"Album {rng.randrange(2000)}", "id": f"MPRE{rng.randrange(10**8):08d}"}
+        duration_seconds = rng.randrange(60, 600)
+        items.append({
+            "category": "Songs",
+            "resultType": "song",
+            "title": f"{query.title()} {i + 1}",
+            "album": album,
+            "inLibrary": False,
+            "feedbackTokens": {"add": None, "remove": None},
+            "videoId": video_id,
+            "videoType": "MUSIC_VIDEO_TYPE_ATV",
+            "duration": f"{duration_seconds // 60}:{duration_seconds % 60:02d}",
+            "year": None,
+            "artists": artists,
+            "isExplicit": rng.random() < 0.15,
+            "thumbnails": [{"url": f"https://lh3.googleusercontent.com/{video_id}=w60-h60", "width": 60, "height": 60}],
+            "duration_seconds": duration_seconds,
+        })
+    return items
+
+
+def synthetic_collections(query: str, filter: str, count: int) -> List[dict]:
+    """Album, artist or playlist results shaped like ytmusicapi's, stable for a given query."""
+    rng = random.Random(zlib.crc32(f"{filter}:{' '.join(query.casefold().split())}".encode("utf-8")))
+    items = []
+    for i in range(count):
+        name = f"{query.title()} {i + 1}"
+        if filter == "albums":
+            items.append({"resultType": "album", "type": "Album", "title": name, "year": str(rng.randrange(1970, 2025)),
+                          "artists": [{"name": f"Artist {rng.randrange(500)}", "id": None}],
+                          "browseId": f"MPREb_{rng.randrange(10**9):09d}"})
+        elif filter == "artists":
+            items.append({"resultType": "artist", "artist": name, "subscribers": f"{rng.randrange(1, 999)}K",
+                          "browseId": f"UC{rng.randrange(10**9):09d}"})
+        else:
+            items.append({"resultType": "playlist", "title": name, "author": f"User {rng.randrange(1000)}",
+                          "itemCount": str(rng.randrange(5, 200)), "browseId": f"VLPL{rng.randrange(10**9):09d}"})
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline search backends for findYTmusic.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run a loopback stub search server.")
+    serve.add_argument("recording", nargs="?", help="JSON recording to replay.")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    serve.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds on top of --latency.")
+    record = commands.add_parser("record", help="Record real YouTube Music responses.")
+    record.add_argument("recording")
+    record.add_argument("queries", nargs="+")
+    record.add_argument("--filter", default="songs")
+    record.add_argument("--limit", type=int, default=Config.SEARCH_RESULT_LIMIT)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        recording = load_recording(args.recording) if args.recording else None
+        server = StubServer(FakeBackend(recording, args.latency, args.jitter), port=args.port).start()
+        print(f"Serving searches on {server.url} (Ctrl+C to stop)")
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        backend = RecordingBackend(YTMusicBackend())
+        for query in args.queries:
+            print(f"{query}: {len(backend.search(query, args.filter, args.limit))} items")
+        backend.save(args.recording)
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
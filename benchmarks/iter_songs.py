@@ -0,0 +1,67 @@
+# benchmarks/iter_songs.py
+"""
+Shows that DatabaseService.iter_songs keeps memory flat as the library grows,
+while load_all_songs grows linearly.
+
+Run from the repository root:
+    python -m benchmarks.iter_songs [ROWS ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from models import SearchResult
+from services import DatabaseService
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+INSERT_CHUNK = 10_000
+
+
+def fill(db: DatabaseService, rows: int) -> None:
+    for start in range(0, rows, INSERT_CHUNK):
+        db.save_results([
+            SearchResult(
+                video_id=f"vid{i:09d}",
+                title=f"Song {i}",
+                artist=f"Artist {i % 5000}",
+                album_name=f"Album {i % 20000}",
+                duration_seconds=210,
+                link=f"https://music.youtube.com/watch?v=vid{i:09d}",
+                is_explicit=bool(i % 2),
+            )
+            for i in range(start, min(start + INSERT_CHUNK, rows))
+        ])
+
+
+def measure(walk: Callable[[], int]) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = walk()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main(sizes: List[int]) -> None:
+    print(f"{'rows':>10} {'method':>15} {'seconds':>9} {'peak MiB':>9}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseService(os.path.join(tmp, "bench.db"))
+            fill(db, rows)
+            walks = {
+                "iter_songs": lambda: sum(1 for _ in db.iter_songs()),
+                "load_all_songs": lambda: len(db.load_all_songs()),
+            }
+            for name, walk in walks.items():
+                count, elapsed, peak = measure(walk)
+                assert count == rows
+                print(f"{rows:>10} {name:>15} {elapsed:>9.2f} {peak / 2**20:>9.1f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,81 @@
+# benchmarks/parse_items.py
+"""
+Parse throughput of services.parse_items against the previous per-item
+parser, which formatted every duration into an 'MM:SS' string.
+
+The corpus is every song list in a recording made with
+`python -m backends record`, repeated up to --items; without a recording,
+synthetic ytmusicapi-shaped items are used.
+
+Run from the repository root:
+    python -m benchmarks.parse_items [--recording FILE] [--items 200000] [--rounds 5]
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from backends import load_recording, synthetic_items
+from models import SearchResult
+from services import parse_items
+
+
+def parse_items_per_item(items: List[dict]) -> List[SearchResult]:
+    """The parser as it was before batch parsing, kept for comparison."""
+    unique_results = {}
+    for item in items:
+        if not item or "videoId" not in item:
+            continue
+        duration_seconds = item.get("duration_seconds")
+        duration_formatted = "N/A"
+        if duration_seconds is not None:
+            minutes, seconds = divmod(duration_seconds, 60)
+            duration_formatted = f"{minutes:02d}:{seconds:02d}"
+        album = item.get("album")
+        unique_results[item["videoId"]] = SearchResult(
+            video_id=item["videoId"],
+            title=item.get("title", "N/A"),
+            artist=", ".join([a["name"] for a in item.get("artists", [])]) or "N/A",
+            album_name=album["name"] if album else "Single",
+            duration_seconds=duration_formatted,
+            link=f"https://music.youtube.com/watch?v={item['videoId']}",
+            is_explicit=item.get("isExplicit", False),
+        )
+    return list(unique_results.values())
+
+
+def load_corpus(recording: str, size: int) -> List[dict]:
+    if recording:
+        items = [item for items in load_recording(recording).values() for item in items if item and "videoId" in item]
+    else:
+        items = synthetic_items("benchmark corpus", min(size, 10_000))
+    corpus = []
+    while len(corpus) < size:
+        corpus.extend(items[:size - len(corpus)])
+    return corpus
+
+
+def best_of(rounds: int, parse: Callable[[List[dict]], List[SearchResult]], corpus: List[dict]) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parse(corpus)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recording", default="")
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.recording, args.items)
+    print(f"{len(corpus)} items, best of {args.rounds} rounds")
+    for name, parse in (("per-item", parse_items_per_item), ("parse_items", parse_items)):
+        elapsed = best_of(args.rounds, parse, corpus)
+        print(f"{name:>12} {elapsed * 1000:9.1f} ms {len(corpus) / elapsed / 1e6:7.2f} M items/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/pipeline.py
+"""
+Load-tests search -> parse -> save -> render with no network, against a
+loopback StubServer with configurable latency and jitter.
+
+Run from the repository root:
+    python -m benchmarks.pipeline [--queries 200] [--concurrency 8]
+                                  [--latency 0.05] [--jitter 0.02] [--recording FILE]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from textual.app import App, ComposeResult
+
+from backends import FakeBackend, HttpStubBackend, StubServer, load_recording
+from models import SearchResult
+from services import DatabaseService, MusicSearchService
+from ui import ResultsDisplay
+
+
+class RenderApp(App):
+    def compose(self) -> ComposeResult:
+        yield ResultsDisplay()
+
+
+async def render(batches: List[List[SearchResult]]) -> List[float]:
+    """Times ResultsDisplay.update_results for each batch in a headless app."""
+    timings = []
+    app = RenderApp()
+    async with app.run_test() as pilot:
+        table = app.query_one(ResultsDisplay)
+        for batch in batches:
+            started = time.perf_counter()
+            table.update_results(batch)
+            await pilot.pause()
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--recording", help="Replay recorded responses instead of synthetic ones.")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording) if args.recording else None
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+    server = StubServer(FakeBackend(recording, args.latency, args.jitter, seed=1)).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(os.path.join(tmp, "bench.db"))
+        service = MusicSearchService(db, backend=HttpStubBackend(server.url))
+
+        started = time.perf_counter()
+        latencies = []
+        for query in queries[:min(20, len(queries))]:
+            t = time.perf_counter()
+            service.search(query, args.limit)
+            latencies.append(time.perf_counter() - t)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batches = [results for _, results, error in service.search_many(queries, args.limit, args.concurrency) if results]
+        fan_out = time.perf_counter() - started
+
+        started = time.perf_counter()
+        db.flush()
+        flushed = time.perf_counter() - started
+        songs = sum(1 for _ in db.iter_songs())
+        service.close()
+        db.close()
+    server.stop()
+
+    render_timings = asyncio.run(render(batches[:50]))
+
+    print(f"single search      median {statistics.median(latencies) * 1000:8.1f} ms over {len(latencies)} searches ({sequential:.2f} s)")
+    print(f"search_many        {len(queries)} queries in {fan_out:.2f} s -> {len(queries) / fan_out:.1f} queries/s at concurrency {args.concurrency}")
+    print(f"final flush        {flushed * 1000:8.1f} ms, {songs} songs in library")
+    print(f"render             median {statistics.median(render_timings) * 1000:8.1f} ms per {args.limit}-row table")
+
+
+if __name__ == "__main__":
+    main()
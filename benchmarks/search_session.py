@@ -0,0 +1,109 @@
+# benchmarks/search_session.py
+"""
+Per-search latency with a fresh YTMusic client per search (the old
+behaviour) versus the shared client and pooled session in MusicSearchService.
+
+Requests for music.youtube.com are redirected to a loopback stub server, so
+no network is needed. The stub speaks plain HTTP, so this measures client
+setup and TCP connection reuse only; TLS handshakes make the real gap larger.
+
+Run from the repository root:
+    python -m benchmarks.search_session [SEARCHES]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backends import YTMusicBackend
+from services import DatabaseService, MusicSearchService
+
+DEFAULT_SEARCHES = 50
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty JSON object over keep-alive HTTP/1.1."""
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class LoopbackAdapter(HTTPAdapter):
+    """Sends every request to the stub server instead of its real host."""
+    def __init__(self, address: str, **kwargs):
+        self.address = address
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit(("http", self.address, parts.path, parts.query, ""))
+        return super().send(request, **kwargs)
+
+
+def loopback_session(address: str) -> requests.Session:
+    session = requests.Session()
+    adapter = LoopbackAdapter(address, pool_maxsize=YTMusicBackend.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def timed(search) -> float:
+    started = time.perf_counter()
+    results, error = search()
+    assert error is None, error
+    return time.perf_counter() - started
+
+
+def main(searches: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(os.path.join(tmp, "bench.db"))
+
+        def fresh_client_search():
+            service = MusicSearchService(db, backend=YTMusicBackend(loopback_session(address)))
+            try:
+                return service.search("benchmark", 20)
+            finally:
+                service.close()
+
+        shared = MusicSearchService(db, backend=YTMusicBackend(loopback_session(address)))
+        timings = {
+            "fresh client": [timed(fresh_client_search) for _ in range(searches)],
+            "shared client": [timed(lambda: shared.search("benchmark", 20)) for _ in range(searches)],
+        }
+        shared.close()
+        db.close()
+    server.shutdown()
+
+    print(f"{'mode':>14} {'first ms':>9} {'median ms':>10} {'p95 ms':>8}")
+    for mode, samples in timings.items():
+        p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+        print(f"{mode:>14} {samples[0] * 1000:>9.2f} {statistics.median(samples) * 1000:>10.2f} {p95 * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SEARCHES)
@@ -5,5 +5,39 @@ from dataclasses import dataclass
 class Config:
     """Holds all application configuration."""
     SEARCH_RESULT_LIMIT: int = 25
+    # Results rendered before the rest of SEARCH_RESULT_LIMIT is fetched in the background.
+    # Only used when the limit is at least twice this, as the backfill fetches this page again.
+    SEARCH_FIRST_PAGE_SIZE: int = 20
+    # "command" (DOWNLOAD_COMMAND per batch), "yt-dlp" (in-process) or "fake" (offline).
+    DOWNLOAD_BACKEND: str = "command"
     DOWNLOAD_COMMAND: str = "gytmdl"
-    DATABASE_FILENAME: str = "ytmusic_library.db"
\ No newline at end of file
+    # Downloads beyond this many wait in the queue.
+    MAX_CONCURRENT_DOWNLOADS: int = 2
+    # Queued songs passed to a single downloader invocation; 1 runs one process per song.
+    DOWNLOAD_BATCH_SIZE: int = 8
+    # Tries per song, counting the first; unfinished downloads resume on the next launch.
+    DOWNLOAD_MAX_ATTEMPTS: int = 3
+    DATABASE_FILENAME: str = "ytmusic_library.db"
+    LIBRARY_PAGE_SIZE: int = 100
+    # "ytmusic", "fake" (in-process, offline) or "stub" (a `python -m backends serve` server).
+    SEARCH_BACKEND: str = "ytmusic"
+    SEARCH_STUB_URL: str = "http://127.0.0.1:8765"
+    # Recorded responses replayed by the fake backend; empty for synthetic results only.
+    SEARCH_RECORDING_FILENAME: str = ""
+    # Show matching library songs immediately, then merge in the online results.
+    HYBRID_SEARCH: bool = True
+    # Search while typing, once the input has been idle for SEARCH_DEBOUNCE_SECONDS.
+    SEARCH_AS_YOU_TYPE: bool = False
+    SEARCH_DEBOUNCE_SECONDS: float = 0.35
+    SEARCH_MIN_CHARS: int = 3
+    # Remote calls share one token bucket; transient failures are retried with backoff.
+    RATE_LIMIT_PER_SECOND: float = 2.0
+    RATE_LIMIT_BURST: int = 5
+    RETRY_ATTEMPTS: int = 4
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 8.0
+    SEARCH_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    SEARCH_CACHE_MAX_ENTRIES: int = 1000
+    SEARCH_CACHE_MEMORY_ENTRIES: int = 100
+    # Results file written by the legacy find_ytmusic_tui.py; imported once on startup.
+    LEGACY_RESULTS_FILENAME: str = "ytmusic_search_results.json"
@@ -0,0 +1,362 @@
+# downloads.py
+"""
+Download scheduling and in-process downloaders for the TUI.
+
+DownloadScheduler runs on the app's asyncio event loop. Jobs wait in a
+priority queue and a fixed number of worker tasks hand them to a
+Downloader, so pressing Enter on many songs never runs more downloads at
+once than the machine can handle.
+
+Besides the external-command Downloader, YtDlpDownloader drives yt-dlp
+inside this process and FakeDownloader simulates downloads offline.
+create_downloader() picks one from Config.DOWNLOAD_BACKEND.
+"""
+import asyncio
+import contextlib
+import itertools
+import math
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import yt_dlp
+except ImportError:
+    yt_dlp = None
+
+from config import Config
+from models import DownloadJob, SearchResult
+from services import DatabaseService, Downloader
+
+# Lower values start first.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+# Failed downloads retried in this session wait behind everything else.
+PRIORITY_RETRY = 2
+
+
+class DownloadScheduler:
+    """
+    Runs downloads with at most 'max_concurrency' in flight. Queued jobs
+    start by priority, then in the order they were added. While paused,
+    running downloads finish but no new ones start. 'on_update' is called
+    on the event loop whenever a job changes state.
+
+    When several jobs are waiting, a worker hands up to 'batch_size' of
+    them to one downloader invocation, so process startup is paid once per
+    batch. Batches shrink so that every worker has something to do.
+
+    With a DatabaseService, every state change is also written to the
+    downloads table, and restore() resumes the queue a previous session
+    left behind. A failed job is tried up to 'max_attempts' times in total.
+    """
+    def __init__(self, downloader: Downloader, max_concurrency: int,
+                 on_update: Callable[[DownloadJob], None], batch_size: int = 1,
+                 db_service: Optional[DatabaseService] = None, max_attempts: int = 1):
+        self.downloader = downloader
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.db_service = db_service
+        self.max_attempts = max_attempts
+        self.on_update = on_update
+        self.jobs: Dict[str, DownloadJob] = {}
+        self._counter = itertools.count()
+        # The queue and event are created in start(): on Python 3.9 they bind to
+        # the loop current at creation, which isn't the app's loop yet.
+        # Entries submitted before then wait in _backlog.
+        self._queue: Optional["asyncio.PriorityQueue"] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._backlog: List[Tuple[int, int, DownloadJob]] = []
+        self._paused = False
+        self._workers: List[asyncio.Task] = []
+        self._busy_workers = 0
+
+    def start(self):
+        """Starts the worker tasks. Must be called from the running event loop."""
+        self._queue = asyncio.PriorityQueue()
+        for entry in self._backlog:
+            self._queue.put_nowait(entry)
+        self._backlog = []
+        self._resumed = asyncio.Event()
+        if not self._paused:
+            self._resumed.set()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"download-worker-{i}")
+            for i in range(self.max_concurrency)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def pause(self):
+        self._paused = True
+        if self._resumed:
+            self._resumed.clear()
+
+    def resume(self):
+        self._paused = False
+        if self._resumed:
+            self._resumed.set()
+
+    def submit(self, result: SearchResult, priority: int = PRIORITY_NORMAL) -> Optional[DownloadJob]:
+        """Queues a download. Returns None if the song is already queued or running."""
+        existing = self.jobs.get(result.video_id)
+        if existing and existing.state in ("queued", "running"):
+            return None
+        job = DownloadJob(result=result, priority=priority)
+        if self.db_service:
+            self.db_service.queue_download_enqueued([result.video_id], priority)
+        self._enqueue(job)
+        return job
+
+    def restore(self, entries: List[Tuple[SearchResult, int, int]]) -> int:
+        """
+        Queues (song, priority, attempts) entries from
+        DatabaseService.load_download_queue(), keeping their attempt counts.
+        Returns how many were queued.
+        """
+        jobs = [
+            DownloadJob(result=result, priority=priority, attempts=attempts)
+            for result, priority, attempts in entries
+            if result.video_id not in self.jobs
+        ]
+        if self.db_service and jobs:
+            self.db_service.queue_download_requeued([job.result.video_id for job in jobs])
+        for job in jobs:
+            self._enqueue(job)
+        return len(jobs)
+
+    def _enqueue(self, job: DownloadJob):
+        self.jobs[job.result.video_id] = job
+        entry = (job.priority, next(self._counter), job)
+        if self._queue is None:
+            self._backlog.append(entry)
+        else:
+            self._queue.put_nowait(entry)
+        self.on_update(job)
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.state == "queued")
+
+    async def _worker(self):
+        while True:
+            await self._resumed.wait()
+            _, _, job = await self._queue.get()
+            batch = [job]
+            # Split what is waiting evenly between this and the other idle workers.
+            share = math.ceil((self._queue.qsize() + 1) / (self.max_concurrency - self._busy_workers))
+            while len(batch) < min(self.batch_size, share) and not self._queue.empty():
+                batch.append(self._queue.get_nowait()[2])
+            self._busy_workers += 1
+            try:
+                # Pausing while this worker waited for a job holds the batch back too.
+                await self._resumed.wait()
+                await self._run(batch)
+            except Exception:
+                # The worker must outlive a failing batch, or concurrency drops for good.
+                self._fail(batch, traceback.format_exc())
+            finally:
+                self._busy_workers -= 1
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _fail(self, batch: List[DownloadJob], error: str):
+        """Marks the jobs of a batch that raised, and have no outcome yet, as failed."""
+        for job in batch:
+            if job.state not in ("queued", "running"):
+                continue
+            job.state = "failed"
+            job.message = f"Download failed for '{job.result.title}'. Details:\n{error}"
+            if self.db_service:
+                self.db_service.queue_download_record(job.result.video_id, "failed", None, None, error=job.message)
+            with contextlib.suppress(Exception):
+                self.on_update(job)
+
+    async def _run(self, batch: List[DownloadJob]):
+        jobs = {job.result.video_id: job for job in batch}
+        if self.db_service:
+            self.db_service.queue_download_started(list(jobs))
+        for job in batch:
+            job.state = "running"
+            job.attempts += 1
+            self.on_update(job)
+
+        def on_progress(video_id: str, percent: float, speed: str, eta: str) -> None:
+            job = jobs[video_id]
+            # Progress bars redraw many times a second; only whole-percent steps reach the UI.
+            changed = job.progress is None or int(percent) != int(job.progress)
+            job.progress, job.speed, job.eta = percent, speed, eta
+            if changed:
+                self.on_update(job)
+
+        outcomes = await self.downloader.run_batch([job.result for job in batch], on_progress)
+        for video_id, (success, message) in outcomes.items():
+            job = jobs[video_id]
+            job.message = message
+            if not success and job.attempts < self.max_attempts:
+                # on_update sees a queued job with a message and can report the retry.
+                job.state = "queued"
+                job.priority = PRIORITY_RETRY
+                job.progress = None
+                if self.db_service:
+                    self.db_service.queue_download_requeued([video_id], PRIORITY_RETRY)
+                self._enqueue(job)
+                continue
+            job.state = "done" if success else "failed"
+            self.on_update(job)
+
+
+class YtDlpDownloader(Downloader):
+    """
+    Downloads with yt_dlp.YoutubeDL inside this process, on a pool of
+    'max_workers' threads. YoutubeDL is not thread-safe, so each worker
+    thread creates one instance and reuses it, with its HTTP connections
+    and cookies, for every download it runs. close() aborts downloads in
+    progress at their next progress update, so exiting doesn't wait for them.
+    """
+    BATCHING = False
+    YDL_OPTIONS = {
+        "format": "bestaudio/best",
+        "outtmpl": "%(title)s [%(id)s].%(ext)s",
+        "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "m4a"}],
+        "quiet": True,
+        "noprogress": True,
+        "noplaylist": True,
+    }
+
+    def __init__(self, max_workers: int, db_service: Optional[DatabaseService] = None):
+        self.command_name = "yt-dlp"
+        self.command_path = None
+        self.db_service = db_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yt-dlp")
+        self._local = threading.local()
+        self._closing = threading.Event()
+
+    @property
+    def is_available(self) -> bool:
+        return yt_dlp is not None
+
+    async def run_batch(self, results: List[SearchResult],
+                        on_progress: Optional[Callable[[str, float, str, str], None]] = None,
+                        ) -> Dict[str, Tuple[bool, str]]:
+        """Downloads the songs one after another on a pool thread; see Downloader.run_batch()."""
+        loop = asyncio.get_running_loop()
+
+        def report(video_id: str, percent: float, speed: str, eta: str) -> None:
+            if on_progress:
+                loop.call_soon_threadsafe(on_progress, video_id, percent, speed, eta)
+
+        outcomes = {}
+        for r in results:
+            if not self.is_available:
+                outcomes[r.video_id] = (False, "yt-dlp is not installed.")
+                continue
+            success, message, output_path = await loop.run_in_executor(self._executor, self._download, r, report)
+            self._record(r, success, output_path, message)
+            outcomes[r.video_id] = (success, message)
+        return outcomes
+
+    def close(self):
+        # Pool threads are joined at interpreter exit; the flag makes running ones stop early.
+        self._closing.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _download(self, result: SearchResult,
+                  report: Callable[[str, float, str, str], None]) -> Tuple[bool, str, Optional[str]]:
+        """Runs on a pool thread with that thread's YoutubeDL instance."""
+        if self._closing.is_set():
+            return False, f"Download of '{result.title}' cancelled.", None
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._local.ydl = yt_dlp.YoutubeDL({**self.YDL_OPTIONS, "progress_hooks": [self._on_hook]})
+        self._local.report = lambda *args: report(result.video_id, *args)
+        try:
+            info = ydl.extract_info(result.link, download=True)
+        except Exception as e:
+            return False, f"Download failed for '{result.title}'. Details:\n{e}", None
+        finally:
+            self._local.report = None
+        downloads = info.get("requested_downloads") or [{}]
+        return True, f"Download successful for '{result.title}'.", downloads[-1].get("filepath")
+
+    def _on_hook(self, status: dict):
+        if self._closing.is_set():
+            raise yt_dlp.utils.DownloadCancelled()
+        report = getattr(self._local, "report", None)
+        if not report or status.get("status") != "downloading":
+            return
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        if not total:
+            return
+        percent = min(100.0, 100.0 * status.get("downloaded_bytes", 0) / total)
+        speed = status.get("speed")
+        eta = status.get("eta")
+        report(
+            percent,
+            f"{speed / (1024 * 1024):.2f}MiB/s" if speed else "",
+            f"{int(eta) // 60:02d}:{int(eta) % 60:02d}" if eta is not None else "",
+        )
+
+
+class FakeDownloader(Downloader):
+    """
+    Simulates downloads without a network or any files. Each song reports
+    progress in 'steps' increments over 'latency' seconds. A seeded
+    generator fails roughly 'failure_rate' of them, so runs are repeatable.
+    """
+    BATCHING = False
+
+    def __init__(self, latency: float = 0.5, steps: int = 10, failure_rate: float = 0.0,
+                 seed: int = 0, db_service: Optional[DatabaseService] = None):
+        self.command_name = "fake"
+        self.command_path = None
+        self.db_service = db_service
+        self.latency = latency
+        self.steps = steps
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    async def run_batch(self, results: List[SearchResult],
+                        on_progress: Optional[Callable[[str, float, str, str], None]] = None,
+                        ) -> Dict[str, Tuple[bool, str]]:
+        outcomes = {}
+        for r in results:
+            failed = self._random.random() < self.failure_rate
+            for step in range(1, self.steps + 1):
+                await asyncio.sleep(self.latency / self.steps)
+                if failed and step > self.steps // 2:
+                    break
+                if on_progress:
+                    remaining = self.latency * (self.steps - step) / self.steps
+                    on_progress(r.video_id, 100.0 * step / self.steps, "", f"00:{int(remaining):02d}")
+            if failed:
+                outcomes[r.video_id] = (False, f"Download failed for '{r.title}'. Details:\nSimulated failure.")
+            else:
+                outcomes[r.video_id] = (True, f"Download successful for '{r.title}'.")
+            self._record(r, not failed, None, outcomes[r.video_id][1])
+        return outcomes
+
+
+def create_downloader(config: Config, db_service: Optional[DatabaseService] = None) -> Downloader:
+    """Builds the downloader selected by Config.DOWNLOAD_BACKEND."""
+    if config.DOWNLOAD_BACKEND == "command":
+        return Downloader(config.DOWNLOAD_COMMAND, db_service)
+    if config.DOWNLOAD_BACKEND == "yt-dlp":
+        return YtDlpDownloader(config.MAX_CONCURRENT_DOWNLOADS, db_service)
+    if config.DOWNLOAD_BACKEND == "fake":
+        return FakeDownloader(db_service=db_service)
+    raise ValueError(f"Unknown download backend '{config.DOWNLOAD_BACKEND}'. Use command, yt-dlp or fake.")
@@ -1,5 +1,9 @@
 # main.py
 import asyncio
+import os
+from dataclasses import replace
+from typing import List, Optional, Set
+
 try:
     import pyperclip
 except ImportError:
@@ -10,19 +14,27 @@ from textual.containers import Container, Horizontal, Vertical
 from textual.reactive import reactive
 from textual.widgets import Footer, Header, Input
 
+from backends import create_backend
 from config import Config
-from models import AppState, SearchResult
-from services import DatabaseService, Downloader, MusicSearchService
-from ui import DetailsPane, LogPane, ResultsDisplay, SearchControls
+from downloads import PRIORITY_HIGH, PRIORITY_NORMAL, DownloadScheduler, create_downloader
+from models import AppState, CollectionResult, DownloadJob, ResultItem, SearchResult
+from services import (DatabaseService, Downloader, LibraryKey, MusicSearchService, SearchCache,
+                      merge_results)
+from throttle import RetryPolicy, TokenBucket
+from ui import DetailsPane, DownloadQueuePane, LogPane, ResultsDisplay, SearchControls
 
 class FindYTMusicApp(App):
     BINDINGS = [
         ("d", "toggle_dark", "Toggle dark mode"), 
         ("q", "quit", "Quit"), 
         ("c", "copy_link", "Copy Link"),
-        ("l", "view_library", "View Library")
+        ("l", "view_library", "View Library"),
+        ("n", "download_next", "Download Next"),
+        ("p", "toggle_downloads", "Pause Downloads"),
+        ("r", "download_again", "Download Again"),
     ]
     CSS_PATH = "find_ytmusic.css"
+    WRITE_ERROR_POLL_SECONDS = 1.0
 
     app_state = reactive(AppState(), always_update=True)
 
@@ -32,37 +44,83 @@ class FindYTMusicApp(App):
         self.downloader = downloader
         self.db_service = db_service
         self.config = config
+        # Searches fired while typing must not pull focus away from the input.
+        self._results_take_focus = True
+        self._search_generation = 0
+        # Songs already looked up in the downloads table; later downloads are marked as they finish.
+        self._download_checked: Set[str] = set()
+        self.download_scheduler = DownloadScheduler(
+            downloader, config.MAX_CONCURRENT_DOWNLOADS, self.on_download_update,
+            batch_size=config.DOWNLOAD_BATCH_SIZE if downloader.BATCHING else 1,
+            db_service=db_service, max_attempts=config.DOWNLOAD_MAX_ATTEMPTS,
+        )
 
     def compose(self) -> ComposeResult:
         yield Header()
         with Container(id="main-container"):
             with Horizontal(id="app-grid"):
                 with Vertical(id="left-pane"):
-                    yield SearchControls()
+                    yield SearchControls(
+                        debounce_seconds=self.config.SEARCH_DEBOUNCE_SECONDS if self.config.SEARCH_AS_YOU_TYPE else None,
+                        min_chars=self.config.SEARCH_MIN_CHARS,
+                    )
                     yield ResultsDisplay(id="results-table")
                 with Vertical(id="right-pane"):
                     yield DetailsPane(id="details-pane")
+                    yield DownloadQueuePane(id="download-queue")
             yield LogPane(id="log", wrap=True, highlight=True, markup=True)
         yield Footer()
 
     def on_mount(self) -> None:
         log = self.query_one(LogPane)
         self.query_one(Input).focus()
+        self.download_scheduler.start()
         if self.downloader.is_available:
-            log.add_message(f"[green]✅ {self.config.DOWNLOAD_COMMAND} found.[/green]")
+            log.add_message(f"[green]✅ {self.downloader.command_name} found.[/green]")
+            self.run_worker(self.resume_downloads(), group="startup_worker")
         else:
-            log.add_message(f"[yellow]⚠️ '{self.config.DOWNLOAD_COMMAND}' not found.[/yellow]")
+            log.add_message(f"[yellow]⚠️ '{self.downloader.command_name}' not found.[/yellow]")
         if pyperclip:
             log.add_message("[green]✅ Clipboard found.[/green]")
         else:
             log.add_message("[yellow]⚠️ 'pyperclip' not installed.[/yellow]")
-        self.action_view_library()
+        # Queued writes fail on the writer thread; surface them here.
+        self.set_interval(self.WRITE_ERROR_POLL_SECONDS, self.report_write_error)
+        if os.path.exists(self.config.LEGACY_RESULTS_FILENAME):
+            self.run_worker(self.import_legacy_results(self.config.LEGACY_RESULTS_FILENAME), group="startup_worker")
+        else:
+            self.action_view_library()
+
+    def report_write_error(self) -> None:
+        error = self.db_service.take_write_error()
+        if error:
+            log = self.query_one(LogPane)
+            log.add_message("[red]❌ Could not save to the library database.[/red]")
+            log.add_message(f"[dim]{error.strip().splitlines()[-1]}[/dim]")
+
+    async def on_unmount(self) -> None:
+        await self.download_scheduler.stop()
 
     def watch_app_state(self, old_state: AppState, new_state: AppState) -> None:
-        if old_state.results != new_state.results:
-            self.query_one(ResultsDisplay).update_results(new_state.results)
+        old_results, new_results = old_state.results, new_state.results
+        if old_results != new_results:
+            table = self.query_one(ResultsDisplay)
+            if old_results and new_results[:len(old_results)] == old_results:
+                added = new_results[len(old_results):]
+                self.check_downloaded(added)
+                table.append_results(added)
+            else:
+                self.check_downloaded(new_results)
+                table.update_results(new_results, focus=self._results_take_focus)
         self.query_one(DetailsPane).update_details(new_state.selected_result)
 
+    def check_downloaded(self, results: List[ResultItem]) -> None:
+        """Marks downloaded songs in the results table, querying each song only once per session."""
+        unchecked = [r.video_id for r in results if isinstance(r, SearchResult) and r.video_id not in self._download_checked]
+        if unchecked:
+            self.query_one(ResultsDisplay).downloaded |= self.db_service.downloaded_ids(unchecked)
+            self._download_checked.update(unchecked)
+
     def action_copy_link(self) -> None:
         log = self.query_one(LogPane)
         if not pyperclip:
@@ -75,59 +133,242 @@ class FindYTMusicApp(App):
             log.add_message("[yellow]⚠️ No song selected.[/yellow]")
 
     def action_view_library(self) -> None:
-        log = self.query_one(LogPane)
-        log.add_message("📚 Loading full music library...")
-        library_results = self.db_service.load_all_songs()
-        self.app_state = AppState(results=library_results)
-        log.add_message(f"💿 Displaying {len(library_results)} songs from your local library.")
-        
+        self.query_one(LogPane).add_message("📚 Loading music library...")
+        self.run_worker(self.load_library_page(None), group="library_worker", exclusive=True)
+
+    def on_results_display_end_reached(self, message: ResultsDisplay.EndReached) -> None:
+        cursor = self.app_state.library_cursor
+        if cursor is not None:
+            self.run_worker(self.load_library_page(cursor), group="library_worker", exclusive=True)
+
     def on_search_controls_search_requested(self, message: SearchControls.SearchRequested) -> None:
-        self.query_one(LogPane).add_message(f"🔎 Searching for '{message.query}'...")
+        if not message.incremental:
+            self.query_one(LogPane).add_message(f"🔎 Searching for '{message.query}'...")
+        # Superseded searches are cancelled; the generation check below also
+        # drops any result that still arrives from their abandoned thread.
+        self._search_generation += 1
         self.workers.cancel_group(self, "search_worker")
-        self.run_worker(self.perform_search(message.query), group="search_worker", exclusive=True)
+        self.run_worker(
+            self.perform_search(message.query, self._search_generation, message.incremental, message.kind),
+            group="search_worker", exclusive=True,
+        )
 
     def on_results_display_row_selected(self, message: ResultsDisplay.RowSelected) -> None:
-        selected = next((r for r in self.app_state.results if r.video_id == message.key), None)
-        if selected:
-             self.run_worker(self.perform_download(selected), group="download_worker")
+        selected = next((r for r in self.app_state.results if r.key == message.key), None)
+        if isinstance(selected, CollectionResult):
+            self.run_worker(self.toggle_collection(selected), group="collection_worker")
+        elif selected:
+            self.queue_download(selected, PRIORITY_NORMAL)
 
     def on_results_display_row_highlighted(self, message: ResultsDisplay.RowHighlighted) -> None:
-        selected = next((r for r in self.app_state.results if r.video_id == message.key), None)
-        self.app_state = AppState(results=self.app_state.results, selected_result=selected)
+        selected = next((r for r in self.app_state.results if r.key == message.key), None)
+        self.app_state = replace(self.app_state, selected_result=selected)
+
+    async def import_legacy_results(self, path: str) -> None:
+        log = self.query_one(LogPane)
+        log.add_message(f"📦 Importing legacy results from '{path}'...")
+        try:
+            count = await asyncio.to_thread(self.db_service.import_legacy_json, path)
+            log.add_message(f"[green]✅ Imported {count} songs. The old file was renamed to '{path}.migrated'.[/green]")
+        except (OSError, ValueError) as e:
+            log.add_message(f"[red]❌ Could not import '{path}': {e}[/red]")
+        self.action_view_library()
 
-    async def perform_search(self, query: str) -> None:
+    async def load_library_page(self, after_key: Optional[LibraryKey]) -> None:
+        if after_key is None:
+            # Make sure songs from recent searches are on disk before listing.
+            await asyncio.to_thread(self.db_service.flush)
+        page, next_key = await asyncio.to_thread(self.db_service.load_page, after_key, self.config.LIBRARY_PAGE_SIZE)
+        if after_key is None:
+            self.app_state = AppState(results=page, library_cursor=next_key)
+            more = " Scroll down to load more." if next_key else ""
+            self.query_one(LogPane).add_message(f"💿 Displaying {len(page)} songs from your local library.{more}")
+        elif after_key == self.app_state.library_cursor:
+            # Only extend the list if it still shows the library page we paged from.
+            self.app_state = replace(self.app_state, results=self.app_state.results + page, library_cursor=next_key)
+
+    async def perform_search(self, query: str, generation: int, incremental: bool = False, kind: str = "songs") -> None:
+        log = self.query_one(LogPane)
+        self._results_take_focus = not incremental
+        if kind != "songs":
+            await self.perform_collection_search(query, generation, incremental, kind)
+            return
+        local_results = []
+        if self.config.HYBRID_SEARCH:
+            # Show library matches right away while the remote search runs.
+            local_results = await asyncio.to_thread(self.db_service.search_local, query, self.config.SEARCH_RESULT_LIMIT)
+            if generation != self._search_generation:
+                return
+            if local_results:
+                self.app_state = AppState(results=local_results, selected_result=None)
+                if not incremental:
+                    log.add_message(f"💿 {len(local_results)} matches in your library. Searching online...")
+
+        # The first page is shown as soon as it arrives; the rest is appended as it is fetched.
+        pages = self.search_service.search_progressive(
+            query, self.config.SEARCH_RESULT_LIMIT, self.config.SEARCH_FIRST_PAGE_SIZE
+        )
+        results: List[SearchResult] = []
+        merged = local_results
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            if generation != self._search_generation:
+                return
+            page_results, error_details = page
+            if error_details:
+                log.add_message(f"[red]❌ An error occurred during search.[/red]")
+                log.add_message(f"[dim]{error_details}[/dim]")
+                if not results:
+                    return
+                break
+            results = results + page_results
+            merged = merge_results(results, local_results)
+            selected = self.app_state.selected_result
+            if selected and all(r.key != selected.key for r in merged):
+                selected = None
+            self.app_state = AppState(results=merged, selected_result=selected)
+        if incremental:
+            return
+        if not merged:
+            log.add_message(f"🤷 No music found for '{query}'.")
+        else:
+            log.add_message(f"🎶 Found {len(results)} results. New entries saved to local library.")
+
+    async def perform_collection_search(self, query: str, generation: int, incremental: bool, kind: str) -> None:
         log = self.query_one(LogPane)
-        results, error_details = await asyncio.to_thread(self.search_service.search, query, self.config.SEARCH_RESULT_LIMIT)
+        results, error_details = await asyncio.to_thread(
+            self.search_service.search_collections, query, kind, self.config.SEARCH_RESULT_LIMIT
+        )
+        if generation != self._search_generation:
+            return
         if error_details:
             log.add_message(f"[red]❌ An error occurred during search.[/red]")
             log.add_message(f"[dim]{error_details}[/dim]")
             return
-            
         self.app_state = AppState(results=results, selected_result=None)
+        if incremental:
+            return
         if not results:
-            log.add_message(f"🤷 No music found for '{query}'.")
+            log.add_message(f"🤷 No {kind} found for '{query}'.")
         else:
-            log.add_message(f"🎶 Found {len(results)} results. New entries saved to local library.")
+            log.add_message(f"🎶 Found {len(results)} {kind}. Press Enter on one to show its tracks.")
 
-    async def perform_download(self, result: SearchResult) -> None:
+    async def toggle_collection(self, collection: CollectionResult) -> None:
+        """Shows a collection's tracks under its row, or hides them if already shown."""
         log = self.query_one(LogPane)
-        if not self.downloader.is_available:
-            log.add_message(f"[red]❌ Download failed: Command not found.[/red]")
+        state = self.app_state
+        if collection.browse_id in state.expanded:
+            hidden = set(state.expanded[collection.browse_id])
+            expanded = {k: v for k, v in state.expanded.items() if k != collection.browse_id}
+            results = [r for r in state.results if r.key not in hidden]
+            self.app_state = replace(state, results=results, expanded=expanded)
+            return
+
+        log.add_message(f"💿 Loading tracks of '[b]{collection.title}[/b]'...")
+        tracks, error_details = await asyncio.to_thread(self.search_service.load_collection, collection)
+        if error_details:
+            log.add_message(f"[red]❌ Could not load '{collection.title}'.[/red]")
+            log.add_message(f"[dim]{error_details}[/dim]")
             return
-        log.add_message(f"📥 Queueing '[b]{result.title}[/b]' for download...")
-        success, message = await asyncio.to_thread(self.downloader.run, result.link, result.title)
-        if success:
-            log.add_message(f"[green]✅ {message}[/green]")
+
+        state = self.app_state
+        position = next((i for i, r in enumerate(state.results) if r.key == collection.browse_id), None)
+        if position is None or collection.browse_id in state.expanded:
+            return
+        shown = {r.key for r in state.results}
+        tracks = [t for t in tracks if t.video_id not in shown]
+        results = state.results[:position + 1] + tracks + state.results[position + 1:]
+        expanded = {**state.expanded, collection.browse_id: [t.video_id for t in tracks]}
+        self.app_state = replace(state, results=results, expanded=expanded)
+        log.add_message(f"🎶 {len(tracks)} tracks from '[b]{collection.title}[/b]'.")
+
+    def action_download_next(self) -> None:
+        """Queues the highlighted song ahead of everything already waiting."""
+        selected = self.app_state.selected_result
+        if isinstance(selected, SearchResult):
+            self.queue_download(selected, PRIORITY_HIGH)
         else:
-            log.add_message(f"[red]❌ {message}[/red]")
+            self.query_one(LogPane).add_message("[yellow]⚠️ No song selected.[/yellow]")
+
+    def action_download_again(self) -> None:
+        """Queues the highlighted song even if it is recorded as downloaded."""
+        selected = self.app_state.selected_result
+        if isinstance(selected, SearchResult):
+            self.queue_download(selected, PRIORITY_HIGH, force=True)
+        else:
+            self.query_one(LogPane).add_message("[yellow]⚠️ No song selected.[/yellow]")
+
+    def action_toggle_downloads(self) -> None:
+        log = self.query_one(LogPane)
+        if self.download_scheduler.paused:
+            self.download_scheduler.resume()
+            log.add_message("▶️ Downloads resumed.")
+        else:
+            self.download_scheduler.pause()
+            log.add_message("⏸️ Downloads paused. Running downloads will finish.")
+
+    def queue_download(self, result: SearchResult, priority: int, force: bool = False) -> None:
+        log = self.query_one(LogPane)
+        if not self.downloader.is_available:
+            log.add_message(f"[red]❌ Download failed: '{self.downloader.command_name}' not found.[/red]")
+            return
+        record = None if force else self.db_service.load_download(result.video_id)
+        # A recorded download whose file has since been deleted is fetched again.
+        # Without a known path (gytmdl doesn't print one), 'r' forces a new download.
+        if record and (not record["output_path"] or os.path.exists(record["output_path"])):
+            where = f" to {record['output_path']}" if record["output_path"] else ""
+            log.add_message(f"✔ '[b]{result.title}[/b]' was already downloaded{where}. Press 'r' to download it again.")
+            return
+        if self.download_scheduler.submit(result, priority) is None:
+            log.add_message(f"[yellow]⚠️ '{result.title}' is already queued.[/yellow]")
+            return
+        log.add_message(
+            f"📥 Queued '[b]{result.title}[/b]' for download "
+            f"({self.download_scheduler.pending} waiting)."
+        )
+
+    async def resume_downloads(self) -> None:
+        """Queues the downloads a previous session left unfinished."""
+        entries = await asyncio.to_thread(self.db_service.load_download_queue, self.config.DOWNLOAD_MAX_ATTEMPTS)
+        restored = self.download_scheduler.restore(entries)
+        if restored:
+            self.query_one(LogPane).add_message(f"📥 Resumed {restored} unfinished downloads.")
+
+    def on_download_update(self, job: DownloadJob) -> None:
+        self.query_one(DownloadQueuePane).update_job(job)
+        log = self.query_one(LogPane)
+        if job.state == "queued" and job.message:
+            log.add_message(f"[yellow]🔁 {job.message}[/yellow]")
+            log.add_message(f"Retrying '[b]{job.result.title}[/b]' (attempt {job.attempts + 1} of {self.config.DOWNLOAD_MAX_ATTEMPTS}).")
+        elif job.state == "done":
+            self.query_one(ResultsDisplay).mark_downloaded(job.result.video_id)
+            log.add_message(f"[green]✅ {job.message}[/green]")
+        elif job.state == "failed":
+            log.add_message(f"[red]❌ {job.message}[/red]")
 
 
 if __name__ == "__main__":
     app_config = Config()
     db_service = DatabaseService(app_config.DATABASE_FILENAME)
-    downloader_service = Downloader(app_config.DOWNLOAD_COMMAND)
-    search_service = MusicSearchService(db_service)
+    downloader_service = create_downloader(app_config, db_service)
+    search_cache = SearchCache(
+        db_service,
+        ttl_seconds=app_config.SEARCH_CACHE_TTL_SECONDS,
+        max_entries=app_config.SEARCH_CACHE_MAX_ENTRIES,
+        memory_entries=app_config.SEARCH_CACHE_MEMORY_ENTRIES,
+    )
+    search_service = MusicSearchService(
+        db_service,
+        backend=create_backend(app_config),
+        cache=search_cache,
+        limiter=TokenBucket(app_config.RATE_LIMIT_PER_SECOND, app_config.RATE_LIMIT_BURST),
+        retry=RetryPolicy(app_config.RETRY_ATTEMPTS, app_config.RETRY_BASE_DELAY, app_config.RETRY_MAX_DELAY),
+    )
     
     app = FindYTMusicApp(search_service, downloader_service, db_service, app_config)
     
-    app.run()
+    try:
+        app.run()
+    finally:
+        search_service.close()
+        downloader_service.close()
+        db_service.close()
@@ -1,6 +1,9 @@
 # models.py
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+# album_name given to songs the search API lists without an album.
+NO_ALBUM = "Single"
 
 @dataclass
 class SearchResult:
@@ -9,12 +12,64 @@ class SearchResult:
     title: str
     artist: str
     album_name: str
-    duration: str
+    duration_seconds: Optional[int]
     link: str
     is_explicit: bool
 
+    @property
+    def key(self) -> str:
+        return self.video_id
+
+@dataclass
+class CollectionResult:
+    """An album, artist or playlist result whose tracks are loaded on demand."""
+    browse_id: str
+    kind: str  # "album", "artist" or "playlist"
+    title: str
+    subtitle: str
+    link: str
+
+    @property
+    def key(self) -> str:
+        return self.browse_id
+
+ResultItem = Union[SearchResult, CollectionResult]
+
+def format_duration(seconds: Optional[int]) -> str:
+    """Renders a duration in seconds as MM:SS, or 'N/A' when unknown."""
+    if seconds is None:
+        return "N/A"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+def parse_duration(text: Optional[str]) -> Optional[int]:
+    """Parses an 'MM:SS' or 'H:MM:SS' string back into seconds."""
+    try:
+        seconds = 0
+        for part in (text or "").split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+@dataclass
+class DownloadJob:
+    """A queued, running or finished download of one song."""
+    result: SearchResult
+    priority: int
+    state: str = "queued"  # "queued", "running", "done" or "failed"
+    message: str = ""
+    attempts: int = 0
+    progress: Optional[float] = None  # percent, once the downloader reports it
+    speed: str = ""
+    eta: str = ""
+
 @dataclass
 class AppState:
     """A single object to hold the entire application state."""
-    results: List[SearchResult] = field(default_factory=list)
-    selected_result: Optional[SearchResult] = None
\ No newline at end of file
+    results: List[ResultItem] = field(default_factory=list)
+    selected_result: Optional[ResultItem] = None
+    # browse_id of each expanded collection -> the video_ids shown under it.
+    expanded: Dict[str, List[str]] = field(default_factory=dict)
+    # Keyset position of the next library page, or None when nothing is left to load.
+    library_cursor: Optional[Tuple[str, str, str, str]] = None
@@ -0,0 +1,349 @@
+# schema.py
+"""
+The SQLite schema and its migrations.
+
+The schema version lives in PRAGMA user_version. Each entry in MIGRATIONS
+upgrades the database by one version; migrate() applies whichever are still
+pending. Migrations are written to be safe to re-run, so a migration that
+was interrupted part-way simply starts over on the next launch.
+"""
+import sqlite3
+import time
+from typing import Callable, Iterable, List, Tuple
+
+from models import NO_ALBUM
+
+MIGRATION_BATCH_SIZE = 1000
+# The FTS5 tokenizer option remove_diacritics 2 needs SQLite 3.27
+# (upserts, INSERT ... ON CONFLICT DO UPDATE, need 3.24).
+MIN_SQLITE_VERSION = (3, 27, 0)
+
+# (video_id, artist, album_name) as stored on a songs row.
+SongLinkRow = Tuple[str, str, str]
+
+
+def migrate(conn: sqlite3.Connection) -> None:
+    """Brings the database schema up to the latest version."""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = ".".join(map(str, MIN_SQLITE_VERSION))
+        raise RuntimeError(f"SQLite {required} or newer is required; this Python uses {sqlite3.sqlite_version}.")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, len(MIGRATIONS) + 1):
+        MIGRATIONS[target - 1](conn)
+        conn.execute(f"PRAGMA user_version = {target}")
+
+
+def split_artists(artist: str) -> List[str]:
+    """Splits the ', '-joined artist string produced by the search parser."""
+    return [name for name in artist.split(", ") if name]
+
+
+def link_songs(conn: sqlite3.Connection, rows: Iterable[SongLinkRow]) -> None:
+    """
+    Records the artists and album of each song in the normalized tables.
+    Songs without an album (the NO_ALBUM placeholder) get no album row.
+    Runs inside the caller's transaction and is idempotent.
+    """
+    song_artists = []
+    song_albums = []
+    for video_id, artist, album_name in rows:
+        names = split_artists(artist)
+        song_artists.extend((video_id, position, name) for position, name in enumerate(names))
+        if names and album_name and album_name != NO_ALBUM:
+            song_albums.append((video_id, album_name, names[0]))
+    conn.executemany(
+        "INSERT OR IGNORE INTO artists (name) VALUES (?)",
+        {(name,) for _, _, name in song_artists},
+    )
+    conn.executemany("""
+        INSERT OR IGNORE INTO song_artists (video_id, artist_id, position)
+        SELECT ?, id, ? FROM artists WHERE name = ?
+    """, song_artists)
+    conn.executemany("""
+        INSERT OR IGNORE INTO albums (name, artist_id)
+        SELECT ?, id FROM artists WHERE name = ?
+    """, {(album_name, primary) for _, album_name, primary in song_albums})
+    # The album_id check keeps rows that are already linked from being rewritten.
+    conn.executemany("""
+        WITH album AS (
+            SELECT albums.id FROM albums
+            JOIN artists ON artists.id = albums.artist_id
+            WHERE albums.name = ? AND artists.name = ?
+        )
+        UPDATE songs SET album_id = (SELECT id FROM album)
+        WHERE video_id = ? AND album_id IS NOT (SELECT id FROM album)
+    """, [(album_name, primary, video_id) for video_id, album_name, primary in song_albums])
+
+
+def _exists(conn: sqlite3.Connection, kind: str, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)
+    ).fetchone() is not None
+
+
+def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _migrate_v1(conn: sqlite3.Connection) -> None:
+    """The songs table, its FTS5 index and the library ordering index."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS songs (
+            video_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            artist TEXT NOT NULL,
+            album_name TEXT,
+            duration TEXT,
+            link TEXT UNIQUE NOT NULL,
+            is_explicit BOOLEAN
+        )
+    """)
+    if not _exists(conn, "table", "songs_fts"):
+        # External-content FTS5 table: the text lives only in 'songs' and
+        # the triggers keep the index in sync with every write.
+        conn.executescript("""
+            CREATE VIRTUAL TABLE songs_fts USING fts5(
+                title, artist, album_name,
+                content='songs', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER songs_fts_ai AFTER INSERT ON songs BEGIN
+                INSERT INTO songs_fts(rowid, title, artist, album_name)
+                VALUES (new.rowid, new.title, new.artist, new.album_name);
+            END;
+            CREATE TRIGGER songs_fts_ad AFTER DELETE ON songs BEGIN
+                INSERT INTO songs_fts(songs_fts, rowid, title, artist, album_name)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album_name);
+            END;
+            CREATE TRIGGER songs_fts_au AFTER UPDATE OF title, artist, album_name ON songs BEGIN
+                INSERT INTO songs_fts(songs_fts, rowid, title, artist, album_name)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album_name);
+                INSERT INTO songs_fts(rowid, title, artist, album_name)
+                VALUES (new.rowid, new.title, new.artist, new.album_name);
+            END;
+            INSERT INTO songs_fts(songs_fts) VALUES ('rebuild');
+        """)
+    if not _exists(conn, "index", "idx_songs_library_order"):
+        with conn:
+            # Keyset comparisons skip NULLs, so older rows get the parser's default.
+            conn.execute("UPDATE songs SET album_name = 'Single' WHERE album_name IS NULL")
+            # video_id is a tie-breaker so every row has a unique keyset position.
+            conn.execute("""
+                CREATE INDEX idx_songs_library_order
+                ON songs (artist, album_name, title, video_id)
+            """)
+
+
+def _migrate_v2(conn: sqlite3.Connection) -> None:
+    """Normalized artists and albums, backfilled from existing songs in batches."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS artists (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS albums (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                artist_id INTEGER NOT NULL REFERENCES artists (id),
+                UNIQUE (name, artist_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS song_artists (
+                video_id TEXT NOT NULL REFERENCES songs (video_id),
+                artist_id INTEGER NOT NULL REFERENCES artists (id),
+                position INTEGER NOT NULL,
+                PRIMARY KEY (video_id, artist_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_song_artists_artist
+            ON song_artists (artist_id, video_id)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_albums_artist ON albums (artist_id)")
+        if not _has_column(conn, "songs", "album_id"):
+            conn.execute("ALTER TABLE songs ADD COLUMN album_id INTEGER REFERENCES albums (id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_songs_album ON songs (album_id)")
+
+    last_rowid = 0
+    while True:
+        rows = conn.execute("""
+            SELECT rowid, video_id, artist, album_name FROM songs
+            WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """, (last_rowid, MIGRATION_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        with conn:
+            link_songs(conn, ((row[1], row[2], row[3]) for row in rows))
+        last_rowid = rows[-1][0]
+
+
+def _migrate_v3(conn: sqlite3.Connection) -> None:
+    """first_seen/last_seen/seen_count freshness tracking on songs."""
+    with conn:
+        for column in ("first_seen INTEGER", "last_seen INTEGER", "seen_count INTEGER NOT NULL DEFAULT 1"):
+            if not _has_column(conn, "songs", column.split()[0]):
+                conn.execute(f"ALTER TABLE songs ADD COLUMN {column}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_songs_last_seen ON songs (last_seen)")
+        # Upserts set every column, so only reindex/relink when the text really changed.
+        conn.execute("DROP TRIGGER IF EXISTS songs_fts_au")
+        conn.execute("""
+            CREATE TRIGGER songs_fts_au AFTER UPDATE OF title, artist, album_name ON songs
+            WHEN old.title IS NOT new.title
+              OR old.artist IS NOT new.artist
+              OR old.album_name IS NOT new.album_name
+            BEGIN
+                INSERT INTO songs_fts(songs_fts, rowid, title, artist, album_name)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album_name);
+                INSERT INTO songs_fts(rowid, title, artist, album_name)
+                VALUES (new.rowid, new.title, new.artist, new.album_name);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS song_artists_au AFTER UPDATE OF artist ON songs
+            WHEN old.artist IS NOT new.artist
+            BEGIN
+                DELETE FROM song_artists WHERE video_id = new.video_id;
+            END
+        """)
+
+    # Existing rows have no history, so treat the upgrade as their first sighting.
+    now = int(time.time())
+    while True:
+        with conn:
+            updated = conn.execute("""
+                UPDATE songs SET first_seen = ?, last_seen = ?
+                WHERE rowid IN (SELECT rowid FROM songs WHERE last_seen IS NULL LIMIT ?)
+            """, (now, now, MIGRATION_BATCH_SIZE)).rowcount
+        if not updated:
+            break
+
+
+def _migrate_v4(conn: sqlite3.Connection) -> None:
+    """Persistent search-result cache, evicted by last use."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                cache_key TEXT PRIMARY KEY,
+                video_ids TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_last_used ON search_cache (last_used)")
+
+
+def _migrate_v5(conn: sqlite3.Connection) -> None:
+    """Cached track lists of albums, artists and playlists, keyed by browse id."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS collections (
+                browse_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                title TEXT NOT NULL,
+                fetched_at INTEGER NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS collection_tracks (
+                browse_id TEXT NOT NULL REFERENCES collections (browse_id),
+                position INTEGER NOT NULL,
+                video_id TEXT NOT NULL REFERENCES songs (video_id),
+                PRIMARY KEY (browse_id, position)
+            ) WITHOUT ROWID
+        """)
+
+
+def _migrate_v6(conn: sqlite3.Connection) -> None:
+    """Stores song durations as integer seconds instead of 'MM:SS' text."""
+    if not _has_column(conn, "songs", "duration"):
+        return
+    with conn:
+        if not _has_column(conn, "songs", "duration_seconds"):
+            conn.execute("ALTER TABLE songs ADD COLUMN duration_seconds INTEGER")
+    max_rowid = conn.execute("SELECT IFNULL(MAX(rowid), 0) FROM songs").fetchone()[0]
+    for start in range(0, max_rowid + 1, MIGRATION_BATCH_SIZE):
+        with conn:
+            conn.execute("""
+                UPDATE songs SET duration_seconds =
+                    CAST(substr(duration, 1, instr(duration, ':') - 1) AS INTEGER) * 60
+                    + CAST(substr(duration, instr(duration, ':') + 1) AS INTEGER)
+                WHERE rowid BETWEEN ? AND ? AND duration GLOB '[0-9]*:[0-9][0-9]'
+            """, (start, start + MIGRATION_BATCH_SIZE - 1))
+    # DROP COLUMN needs SQLite 3.35. Older libraries keep the nullable text
+    # column; nothing reads or writes it once duration_seconds exists.
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        with conn:
+            conn.execute("ALTER TABLE songs DROP COLUMN duration")
+
+
+def _migrate_v7(conn: sqlite3.Connection) -> None:
+    """Outcome of each song's last download, so finished ones are not fetched again."""
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                video_id TEXT PRIMARY KEY,
+                output_path TEXT,
+                size_bytes INTEGER,
+                completed_at INTEGER NOT NULL,
+                status TEXT NOT NULL
+            )
+        """)
+
+
+def _migrate_v8(conn: sqlite3.Connection) -> None:
+    """
+    Turns downloads into a persistent queue: rows now also exist while a
+    song is queued or running, with its priority and attempt count.
+    Rebuilt because completed_at can no longer be NOT NULL.
+    """
+    if _has_column(conn, "downloads", "attempts"):
+        return
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS downloads_new")
+        conn.execute("""
+            CREATE TABLE downloads_new (
+                video_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 1,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                output_path TEXT,
+                size_bytes INTEGER,
+                queued_at INTEGER NOT NULL,
+                completed_at INTEGER
+            )
+        """)
+        conn.execute("""
+            INSERT INTO downloads_new (video_id, status, attempts, output_path, size_bytes, queued_at, completed_at)
+            SELECT video_id, status, 1, output_path, size_bytes, completed_at, completed_at FROM downloads
+        """)
+        conn.execute("DROP TABLE downloads")
+        conn.execute("ALTER TABLE downloads_new RENAME TO downloads")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_downloads_queue ON downloads (status, priority, queued_at)")
+
+
+def _migrate_v9(conn: sqlite3.Connection) -> None:
+    """Drops the albums that earlier versions created for the NO_ALBUM placeholder."""
+    with conn:
+        conn.execute("UPDATE songs SET album_id = NULL WHERE album_name = ? AND album_id IS NOT NULL", (NO_ALBUM,))
+        conn.execute("""
+            DELETE FROM albums WHERE name = ?
+            AND NOT EXISTS (SELECT 1 FROM songs WHERE songs.album_id = albums.id)
+        """, (NO_ALBUM,))
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+    _migrate_v8,
+    _migrate_v9,
+]
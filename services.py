@@ -1,131 +1,1072 @@
 # services.py
+import asyncio
+import csv
+import gzip
+import json
+import os
+import queue
+import re
 import shutil
 import sqlite3
-import subprocess
+import threading
+import time
 import traceback
-from typing import List, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import fields
+from functools import partial
+from typing import IO, Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from ytmusicapi import YTMusic
+import schema
+from backends import SearchBackend, YTMusicBackend
+from throttle import BACKGROUND, INTERACTIVE, RetryPolicy, TokenBucket
+from models import NO_ALBUM, CollectionResult, SearchResult, parse_duration
+
+# (artist, album_name, title, video_id) of the last row on a library page.
+LibraryKey = Tuple[str, str, str, str]
+LINK_PREFIX = "https://music.youtube.com/watch?v="
+# Columns that make up a SearchResult, in field order.
+SONG_COLUMNS = "songs.video_id, songs.title, songs.artist, songs.album_name, songs.duration_seconds, songs.link, songs.is_explicit"
+# (query, results, error details) for each finished search in search_many().
+SearchOutcomes = Iterator[Tuple[str, Optional[List[SearchResult]], Optional[str]]]
+# A unit of work for the writer thread, applied inside its transaction.
+WriteOp = Callable[[sqlite3.Connection], None]
+
+def iter_json_array(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array one at a time, reading
+    'f' in chunks so the whole document never has to be in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, started = "", 0, False
+    while True:
+        chunk = f.read(chunk_size)
+        buffer, pos = buffer[pos:] + chunk, 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array.")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # The element continues in the next chunk.
+            if chunk and (end == len(buffer) or buffer[end] not in " \t\r\n,]"):
+                # A number cut off by the chunk boundary ("12" of "123", "2." of
+                # "2.5") still decodes; only accept it once a separator follows.
+                break
+            pos = end
+            yield item
+        if not chunk:
+            if started:
+                raise ValueError("Unexpected end of JSON array.")
+            return
+
+
+def merge_results(primary: List[SearchResult], secondary: List[SearchResult]) -> List[SearchResult]:
+    """
+    Combines two ranked result lists: 'primary' keeps its order and wins on
+    duplicates, and entries found only in 'secondary' follow in their order.
+    """
+    seen = {r.video_id for r in primary}
+    return primary + [r for r in secondary if r.video_id not in seen]
+
+
+def parse_items(items: Iterable[dict]) -> List[SearchResult]:
+    """
+    Parses a batch of raw song items into SearchResults, skipping items
+    without a videoId and keeping one result per video_id. Durations stay
+    integer seconds; they are only formatted for display.
+    """
+    parsed: Dict[str, SearchResult] = {}
+    make_result = SearchResult
+    for item in items:
+        video_id = item.get("videoId") if item else None
+        if not video_id:
+            continue
+        artists = item.get("artists")
+        album = item.get("album")
+        parsed[video_id] = make_result(
+            video_id,
+            item.get("title", "N/A"),
+            (", ".join([a["name"] for a in artists]) or "N/A") if artists else "N/A",
+            album["name"] if album else NO_ALBUM,
+            item.get("duration_seconds"),
+            LINK_PREFIX + video_id,
+            item.get("isExplicit", False),
+        )
+    return list(parsed.values())
 
-from models import SearchResult
 
 class DatabaseService:
     """
     A thread-safe service to manage all SQLite database interactions.
-    Connections are created per-method to ensure thread safety.
+    Each thread reuses its own long-lived connection, opened in WAL mode so
+    readers and the writer don't block each other.
     """
+    BUSY_TIMEOUT_MS = 5000
+    CACHE_SIZE_KIB = 16384
+    MMAP_SIZE_BYTES = 64 * 1024 * 1024
+    WRITE_QUEUE_SIZE = 256
+    WRITE_BATCH_MAX = 64
+    # Sightings closer together than this don't bump last_seen/seen_count.
+    SEEN_RESOLUTION_SECONDS = 3600
+    IMPORT_CHUNK_SIZE = 5000
+
     def __init__(self, db_name: str):
         self.db_name = db_name
-        # The connection is no longer created here.
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
         self.create_table()
+        # Writes queued via queue_results() are applied by a single writer thread.
+        self.last_write_error: Optional[str] = None
+        self._write_error_lock = threading.Lock()
+        self._write_queue: "queue.Queue[Optional[WriteOp]]" = queue.Queue(maxsize=self.WRITE_QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a new connection with the pragmas tuned for this app."""
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        # NORMAL is durable across application crashes in WAL mode and
+        # avoids an fsync on every commit.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{self.CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE_BYTES}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Returns the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._pool_lock:
+                self._connections.append(conn)
+        return conn
 
     def create_table(self):
-        """Creates the songs table if it doesn't exist."""
-        # This method creates its own connection to run the initial setup.
-        with sqlite3.connect(self.db_name) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS songs (
-                    video_id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    artist TEXT NOT NULL,
-                    album_name TEXT,
-                    duration TEXT,
-                    link TEXT UNIQUE NOT NULL,
-                    is_explicit BOOLEAN
-                )
-            """)
+        """Creates the schema, or migrates an existing database to the latest version."""
+        schema.migrate(self.connection)
 
     def save_results(self, results: List[SearchResult]):
-        """Saves a list of search results to the database, ignoring duplicates."""
+        """Saves a list of search results, refreshing metadata that has changed."""
+        # 'with' wraps the batch in a single transaction on this thread's connection.
+        with self.connection as conn:
+            self._insert_results(conn, results)
+
+    def queue_results(self, results: List[SearchResult]):
+        """
+        Hands search results to the background writer and returns at once.
+        Blocks only when the write queue is full. Use flush() to wait for
+        the data to reach the database.
+        """
+        self._write_queue.put(partial(self._insert_results, results=results))
+
+    def flush(self):
+        """Waits until every queued write has been committed."""
+        self._write_queue.join()
+
+    def _insert_results(self, conn: sqlite3.Connection, results: List[SearchResult]):
+        now = int(time.time())
         data_to_insert = [
-            (r.video_id, r.title, r.artist, r.album_name, r.duration, r.link, r.is_explicit)
+            (r.video_id, r.title, r.artist, r.album_name or NO_ALBUM, r.duration_seconds, r.link, r.is_explicit, now)
             for r in results
         ]
-        # A new connection is created here, used, and then automatically closed.
-        # This is safe to call from any thread.
-        with sqlite3.connect(self.db_name) as conn:
-            conn.executemany("""
-                INSERT OR IGNORE INTO songs 
-                (video_id, title, artist, album_name, duration, link, is_explicit) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, data_to_insert)
+        # Existing rows are only touched when a field changed or their
+        # last_seen is older than SEEN_RESOLUTION_SECONDS, so repeated
+        # searches for the same songs don't rewrite their pages.
+        conn.executemany(f"""
+            INSERT INTO songs
+            (video_id, title, artist, album_name, duration_seconds, link, is_explicit, first_seen, last_seen, seen_count)
+            VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?8, 1)
+            ON CONFLICT (video_id) DO UPDATE SET
+                title = excluded.title,
+                artist = excluded.artist,
+                album_name = excluded.album_name,
+                duration_seconds = excluded.duration_seconds,
+                link = excluded.link,
+                is_explicit = excluded.is_explicit,
+                last_seen = excluded.last_seen,
+                seen_count = songs.seen_count + 1
+            WHERE songs.title IS NOT excluded.title
+               OR songs.artist IS NOT excluded.artist
+               OR songs.album_name IS NOT excluded.album_name
+               OR songs.duration_seconds IS NOT excluded.duration_seconds
+               OR songs.link IS NOT excluded.link
+               OR songs.is_explicit IS NOT excluded.is_explicit
+               OR songs.last_seen <= excluded.last_seen - {self.SEEN_RESOLUTION_SECONDS}
+        """, data_to_insert)
+        schema.link_songs(conn, ((row[0], row[2], row[3]) for row in data_to_insert))
+
+    def _writer_loop(self):
+        """
+        Runs on the writer thread. Everything already waiting in the queue
+        is committed together, so bursts of searches cost one transaction.
+        """
+        while True:
+            batch = [self._write_queue.get()]
+            while batch[-1] is not None and len(batch) < self.WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            writes = [write for write in batch if write is not None]
+            try:
+                if writes:
+                    self._commit_writes(writes)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+            if len(writes) < len(batch):
+                return
+
+    def _commit_writes(self, writes: List[WriteOp]):
+        # Any exception is caught: one that escaped would end the writer thread
+        # and leave every later queue_*() call blocked on a full queue.
+        try:
+            with self.connection as conn:
+                for write in writes:
+                    write(conn)
+        except Exception:
+            # Retry one by one so a single bad batch doesn't drop the others.
+            for write in writes:
+                try:
+                    with self.connection as conn:
+                        write(conn)
+                except Exception:
+                    with self._write_error_lock:
+                        self.last_write_error = traceback.format_exc()
+
+    def take_write_error(self) -> Optional[str]:
+        """Returns the traceback of the last failed queued write, if any, and clears it."""
+        with self._write_error_lock:
+            error, self.last_write_error = self.last_write_error, None
+        return error
 
     def load_all_songs(self) -> List[SearchResult]:
         """Loads all songs from the database, sorted for display."""
-        # This method also creates its own connection.
-        with sqlite3.connect(self.db_name) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                "SELECT * FROM songs ORDER BY artist, album_name, title"
+        cursor = self.connection.execute(
+            f"SELECT {SONG_COLUMNS} FROM songs ORDER BY artist, album_name, title"
+        )
+        return [self._to_result(row) for row in cursor.fetchall()]
+
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """
+        Yields every song in library order without materializing the table.
+        Rows are fetched 'batch_size' at a time, so memory stays flat no
+        matter how large the library is.
+        """
+        cursor = self.connection.execute(
+            f"SELECT {SONG_COLUMNS} FROM songs ORDER BY artist, album_name, title, video_id"
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def export_library(self, path: str, format: Optional[str] = None) -> int:
+        """
+        Streams the whole library to 'path' as JSONL or CSV, gzip-compressed
+        if the format (or file name) ends in '.gz'. Returns the song count.
+        """
+        fmt, compressed = self._resolve_format(path, format)
+        count = 0
+        with self._open_export_file(path, "w", compressed) as f:
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(SearchResult)])
+                writer.writeheader()
+            for row in self.iter_songs():
+                record = dict(row)
+                record["is_explicit"] = bool(record["is_explicit"])
+                if fmt == "csv":
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_library(self, path: str, format: Optional[str] = None) -> int:
+        """
+        Loads a file written by export_library(), merging it into the
+        library. Rows are committed in chunks of IMPORT_CHUNK_SIZE, one
+        transaction each. Returns the number of rows read.
+        """
+        fmt, compressed = self._resolve_format(path, format)
+        count = 0
+        with self._open_export_file(path, "r", compressed) as f:
+            if fmt == "csv":
+                records = csv.DictReader(f)
+            else:
+                records = (json.loads(line) for line in f if line.strip())
+            chunk: List[SearchResult] = []
+            for record in records:
+                chunk.append(self._record_to_result(record))
+                if len(chunk) >= self.IMPORT_CHUNK_SIZE:
+                    self.save_results(chunk)
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                self.save_results(chunk)
+                count += len(chunk)
+        return count
+
+    def import_legacy_json(self, path: str) -> int:
+        """
+        Moves results saved by the legacy find_ytmusic_tui.py (a JSON array
+        of SearchResult dicts) into the library. The file is parsed
+        incrementally and committed in IMPORT_CHUNK_SIZE batches, then
+        renamed to '<path>.migrated' so it is only imported once.
+        Returns the number of songs imported.
+        """
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            chunk: List[SearchResult] = []
+            for record in iter_json_array(f):
+                if not record.get("video_id"):
+                    # Early legacy files left video_id empty; recover it from the link.
+                    link = record.get("link") or ""
+                    if "watch?v=" not in link:
+                        continue
+                    record["video_id"] = link.split("watch?v=", 1)[1].split("&", 1)[0]
+                chunk.append(self._record_to_result(record))
+                if len(chunk) >= self.IMPORT_CHUNK_SIZE:
+                    self.save_results(chunk)
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                self.save_results(chunk)
+                count += len(chunk)
+        os.replace(path, path + ".migrated")
+        return count
+
+    @staticmethod
+    def _resolve_format(path: str, format: Optional[str]) -> Tuple[str, bool]:
+        """Works out ('jsonl' | 'csv', gzipped?) from 'format' or the file name."""
+        name = (format or path).lower()
+        compressed = name.endswith(".gz")
+        if compressed:
+            name = name[:-3]
+        fmt = name.rsplit(".", 1)[-1]
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unsupported library format '{format or path}'. Use jsonl or csv, optionally .gz.")
+        return fmt, compressed
+
+    @staticmethod
+    def _open_export_file(path: str, mode: str, compressed: bool) -> IO[str]:
+        if compressed:
+            return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+        return open(path, mode, encoding="utf-8", newline="")
+
+    @staticmethod
+    def _record_to_result(record: dict) -> SearchResult:
+        is_explicit = record.get("is_explicit", False)
+        if isinstance(is_explicit, str):
+            is_explicit = is_explicit.strip().lower() in ("1", "true", "yes")
+        duration_seconds = record.get("duration_seconds")
+        if duration_seconds in (None, ""):
+            # Older exports and the legacy JSON file store 'MM:SS' text.
+            duration_seconds = parse_duration(record.get("duration"))
+        return SearchResult(
+            video_id=record["video_id"],
+            title=record.get("title") or "N/A",
+            artist=record.get("artist") or "N/A",
+            album_name=record.get("album_name") or NO_ALBUM,
+            duration_seconds=int(duration_seconds) if duration_seconds is not None else None,
+            link=record.get("link") or LINK_PREFIX + record["video_id"],
+            is_explicit=bool(is_explicit),
+        )
+
+    def load_page(self, after_key: Optional[LibraryKey], page_size: int) -> Tuple[List[SearchResult], Optional[LibraryKey]]:
+        """
+        Loads one page of the library in display order, starting after
+        'after_key'. Returns the page and the key to pass for the next one,
+        which is None once the library is exhausted.
+        """
+        if after_key is None:
+            cursor = self.connection.execute(f"""
+                SELECT {SONG_COLUMNS} FROM songs
+                ORDER BY artist, album_name, title, video_id
+                LIMIT ?
+            """, (page_size,))
+        else:
+            cursor = self.connection.execute(f"""
+                SELECT {SONG_COLUMNS} FROM songs
+                WHERE (artist, album_name, title, video_id) > (?, ?, ?, ?)
+                ORDER BY artist, album_name, title, video_id
+                LIMIT ?
+            """, (*after_key, page_size))
+        page = [self._to_result(row) for row in cursor.fetchall()]
+        if len(page) < page_size:
+            return page, None
+        last = page[-1]
+        return page, (last.artist, last.album_name, last.title, last.video_id)
+
+    def load_songs(self, video_ids: List[str]) -> List[SearchResult]:
+        """Loads the given songs, in the order of 'video_ids', skipping unknown ids."""
+        found = {}
+        for start in range(0, len(video_ids), 500):
+            chunk = video_ids[start:start + 500]
+            cursor = self.connection.execute(
+                f"SELECT {SONG_COLUMNS} FROM songs WHERE video_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for row in cursor:
+                found[row["video_id"]] = self._to_result(row)
+        return [found[video_id] for video_id in video_ids if video_id in found]
+
+    def load_cached_search(self, cache_key: str, max_age_seconds: int) -> Optional[Tuple[int, List[SearchResult]]]:
+        """
+        Returns (created_at, results) stored for 'cache_key', or None if there
+        are none, they are older than 'max_age_seconds', or a song is missing.
+        """
+        row = self.connection.execute(
+            "SELECT video_ids, created_at FROM search_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        now = int(time.time())
+        if row is None or row["created_at"] <= now - max_age_seconds:
+            return None
+        video_ids = json.loads(row["video_ids"])
+        results = self.load_songs(video_ids)
+        if len(results) != len(video_ids):
+            return None
+        self._write_queue.put(partial(self._touch_cached_search, cache_key=cache_key, now=now))
+        return row["created_at"], results
+
+    def queue_cached_search(self, cache_key: str, video_ids: List[str], max_entries: int):
+        """Stores a search's result order via the writer, evicting least-recently-used entries."""
+        self._write_queue.put(partial(
+            self._store_cached_search, cache_key=cache_key, video_ids=video_ids, max_entries=max_entries,
+        ))
+
+    def _touch_cached_search(self, conn: sqlite3.Connection, cache_key: str, now: int):
+        conn.execute("UPDATE search_cache SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+
+    def _store_cached_search(self, conn: sqlite3.Connection, cache_key: str, video_ids: List[str], max_entries: int):
+        now = int(time.time())
+        conn.execute("""
+            INSERT OR REPLACE INTO search_cache (cache_key, video_ids, created_at, last_used)
+            VALUES (?, ?, ?, ?)
+        """, (cache_key, json.dumps(video_ids), now, now))
+        conn.execute("""
+            DELETE FROM search_cache WHERE cache_key IN (
+                SELECT cache_key FROM search_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (max_entries,))
+
+    def load_collection_tracks(self, browse_id: str) -> Optional[List[SearchResult]]:
+        """Returns a collection's cached tracks in order, or None if it was never fetched."""
+        if self.connection.execute(
+            "SELECT 1 FROM collections WHERE browse_id = ?", (browse_id,)
+        ).fetchone() is None:
+            return None
+        cursor = self.connection.execute(f"""
+            SELECT {SONG_COLUMNS} FROM collection_tracks
+            JOIN songs ON songs.video_id = collection_tracks.video_id
+            WHERE collection_tracks.browse_id = ?
+            ORDER BY collection_tracks.position
+        """, (browse_id,))
+        return [self._to_result(row) for row in cursor.fetchall()]
+
+    def queue_collection(self, collection: CollectionResult, tracks: List[SearchResult]):
+        """Saves a collection's tracks and their order via the writer thread."""
+        self._write_queue.put(partial(self._store_collection, collection=collection, tracks=tracks))
+
+    def _store_collection(self, conn: sqlite3.Connection, collection: CollectionResult, tracks: List[SearchResult]):
+        self._insert_results(conn, tracks)
+        conn.execute("""
+            INSERT OR REPLACE INTO collections (browse_id, kind, title, fetched_at)
+            VALUES (?, ?, ?, ?)
+        """, (collection.browse_id, collection.kind, collection.title, int(time.time())))
+        conn.execute("DELETE FROM collection_tracks WHERE browse_id = ?", (collection.browse_id,))
+        conn.executemany(
+            "INSERT INTO collection_tracks (browse_id, position, video_id) VALUES (?, ?, ?)",
+            [(collection.browse_id, position, track.video_id) for position, track in enumerate(tracks)],
+        )
+
+    def load_download(self, video_id: str) -> Optional[sqlite3.Row]:
+        """Returns the (output_path, size_bytes, completed_at) of a finished download, if any."""
+        return self.connection.execute(
+            "SELECT output_path, size_bytes, completed_at FROM downloads WHERE video_id = ? AND status = 'done'",
+            (video_id,),
+        ).fetchone()
+
+    def downloaded_ids(self, video_ids: List[str]) -> Set[str]:
+        """Returns which of 'video_ids' have finished downloading."""
+        found = set()
+        for start in range(0, len(video_ids), 500):
+            chunk = video_ids[start:start + 500]
+            cursor = self.connection.execute(
+                f"SELECT video_id FROM downloads WHERE status = 'done' AND video_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
             )
-            return [SearchResult(**row) for row in cursor.fetchall()]
+            found.update(row[0] for row in cursor)
+        return found
+
+    def load_download_queue(self, max_attempts: int) -> List[Tuple[SearchResult, int, int]]:
+        """
+        Returns (song, priority, attempts) for every download left unfinished:
+        queued, interrupted while running, or failed fewer than
+        'max_attempts' times. Ordered as the scheduler should start them.
+        """
+        cursor = self.connection.execute(f"""
+            SELECT {SONG_COLUMNS}, downloads.priority, downloads.attempts
+            FROM downloads JOIN songs ON songs.video_id = downloads.video_id
+            WHERE downloads.status IN ('queued', 'running')
+               OR (downloads.status = 'failed' AND downloads.attempts < ?)
+            ORDER BY downloads.priority, downloads.queued_at, downloads.rowid
+        """, (max_attempts,))
+        song_width = len(fields(SearchResult))
+        return [(SearchResult(*row[:song_width]), row["priority"], row["attempts"]) for row in cursor]
+
+    def queue_download_enqueued(self, video_ids: List[str], priority: int):
+        """Marks downloads as newly requested via the writer; they start over with no attempts."""
+        self._write_queue.put(partial(self._store_download_enqueued, video_ids=video_ids, priority=priority))
+
+    def _store_download_enqueued(self, conn: sqlite3.Connection, video_ids: List[str], priority: int):
+        now = int(time.time())
+        conn.executemany("""
+            INSERT INTO downloads (video_id, status, priority, queued_at) VALUES (?, 'queued', ?, ?)
+            ON CONFLICT (video_id) DO UPDATE SET
+                status = 'queued', priority = excluded.priority, attempts = 0, last_error = NULL,
+                output_path = NULL, size_bytes = NULL, queued_at = excluded.queued_at, completed_at = NULL
+        """, [(v, priority, now) for v in video_ids])
+
+    def queue_download_requeued(self, video_ids: List[str], priority: Optional[int] = None):
+        """
+        Marks resumed or retried downloads as queued again via the writer,
+        keeping their attempt counts. A given priority replaces the stored one.
+        """
+        self._write_queue.put(partial(self._store_download_requeued, video_ids=video_ids, priority=priority))
+
+    def _store_download_requeued(self, conn: sqlite3.Connection, video_ids: List[str], priority: Optional[int]):
+        conn.executemany(
+            "UPDATE downloads SET status = 'queued', priority = IFNULL(?, priority) WHERE video_id = ?",
+            [(priority, v) for v in video_ids],
+        )
+
+    def queue_download_started(self, video_ids: List[str]):
+        """Marks downloads as running and counts the attempt, via the writer."""
+        self._write_queue.put(partial(self._store_download_started, video_ids=video_ids))
 
-    # The close() method is no longer needed, as connections are managed by 'with'.
+    def _store_download_started(self, conn: sqlite3.Connection, video_ids: List[str]):
+        conn.executemany(
+            "UPDATE downloads SET status = 'running', attempts = attempts + 1 WHERE video_id = ?",
+            [(v,) for v in video_ids],
+        )
+
+    def queue_download_record(self, video_id: str, status: str, output_path: Optional[str],
+                              size_bytes: Optional[int], error: Optional[str] = None):
+        """Records a download's outcome via the writer."""
+        self._write_queue.put(partial(
+            self._store_download, video_id=video_id, status=status, output_path=output_path,
+            size_bytes=size_bytes, error=error,
+        ))
+
+    def _store_download(self, conn: sqlite3.Connection, video_id: str, status: str,
+                        output_path: Optional[str], size_bytes: Optional[int], error: Optional[str]):
+        now = int(time.time())
+        # Downloads run outside the scheduler have no queued row to update.
+        conn.execute("""
+            INSERT INTO downloads (video_id, status, attempts, last_error, output_path, size_bytes, queued_at, completed_at)
+            VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (video_id) DO UPDATE SET
+                status = excluded.status, last_error = excluded.last_error, output_path = excluded.output_path,
+                size_bytes = excluded.size_bytes, completed_at = excluded.completed_at
+        """, (video_id, status, error, output_path, size_bytes, now, now))
+
+    def load_stale(self, older_than_seconds: int, limit: int) -> List[SearchResult]:
+        """Loads songs not seen in a search for 'older_than_seconds', oldest first."""
+        cursor = self.connection.execute(f"""
+            SELECT {SONG_COLUMNS} FROM songs
+            WHERE last_seen < ?
+            ORDER BY last_seen
+            LIMIT ?
+        """, (int(time.time()) - older_than_seconds, limit))
+        return [self._to_result(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _to_result(row: sqlite3.Row) -> SearchResult:
+        return SearchResult(**row)
+
+    def list_artists(self) -> List[Tuple[str, int]]:
+        """Returns every artist in the library with their song count, by name."""
+        cursor = self.connection.execute("""
+            SELECT artists.name, COUNT(*) FROM artists
+            JOIN song_artists ON song_artists.artist_id = artists.id
+            GROUP BY artists.id
+            ORDER BY artists.name
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def list_albums(self) -> List[Tuple[str, str, int]]:
+        """Returns (album, primary artist, song count) for every album, by artist."""
+        cursor = self.connection.execute("""
+            SELECT albums.name, artists.name, COUNT(*) FROM albums
+            JOIN artists ON artists.id = albums.artist_id
+            JOIN songs ON songs.album_id = albums.id
+            GROUP BY albums.id
+            ORDER BY artists.name, albums.name
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def load_songs_by_artist(self, artist: str) -> List[SearchResult]:
+        """Loads every song credited to 'artist', including features."""
+        cursor = self.connection.execute(f"""
+            SELECT {SONG_COLUMNS} FROM artists
+            JOIN song_artists ON song_artists.artist_id = artists.id
+            JOIN songs ON songs.video_id = song_artists.video_id
+            WHERE artists.name = ?
+            ORDER BY songs.album_name, songs.title
+        """, (artist,))
+        return [self._to_result(row) for row in cursor.fetchall()]
+
+    def search_local(self, query: str, limit: int) -> List[SearchResult]:
+        """Searches the local library, best matches first (bm25 over title, artist, album)."""
+        match = self._fts_query(query)
+        if not match:
+            return []
+        cursor = self.connection.execute(f"""
+            SELECT {SONG_COLUMNS} FROM songs_fts
+            JOIN songs ON songs.rowid = songs_fts.rowid
+            WHERE songs_fts MATCH ?
+            ORDER BY bm25(songs_fts, 10.0, 5.0, 2.0)
+            LIMIT ?
+        """, (match, limit))
+        return [self._to_result(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Turns free text into an FTS5 query: every word must match as a
+        prefix, and user input is quoted so FTS syntax can't leak through.
+        """
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def close(self):
+        """
+        Commits pending writes, stops the writer thread and closes every
+        pooled connection. Call once on application exit.
+        """
+        if self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join()
+        with self._pool_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
 
 class Downloader:
-    """A service to manage the external download command."""
-    def __init__(self, command: str):
+    """
+    A service to manage the external download command. When given a
+    DatabaseService, each outcome is recorded in its downloads table.
+    """
+    # Whether run_batch() costs less than one run() per song.
+    BATCHING = True
+    # Output lines kept for the error message when a download fails.
+    ERROR_TAIL_LINES = 20
+    # Longest line kept while waiting for a line break; the rest is dropped.
+    MAX_LINE_BYTES = 64 * 1024
+    READ_CHUNK_BYTES = 4096
+    # yt-dlp style: "[download]  42.3% of ~ 3.45MiB at 1.20MiB/s ETA 00:02". Anchored on the
+    # prefix so a percentage in another line (a title like "100% Pure Love") isn't progress.
+    PROGRESS_RE = re.compile(
+        r"^\[download\]\s+(?P<percent>\d{1,3}(?:\.\d+)?)%"
+        r"(?:.*?\bat\s+(?P<speed>\S+/s))?"
+        r"(?:.*?\bETA\s+(?P<eta>[\d:]+))?"
+    )
+    # yt-dlp ("ERROR: ...") and gytmdl ("[ERROR    12:34:56] ...") error lines.
+    ERROR_RE = re.compile(r"^(?:ERROR:|\[ERROR\b)")
+    # gytmdl's "(URL 2/5" prefix, numbering the URLs it was given from 1.
+    URL_INDEX_RE = re.compile(r"\(URL (?P<index>\d+)/\d+")
+    # Lines naming the file a download ends up in; the last match wins.
+    OUTPUT_PATH_RES = (
+        re.compile(r"Destination:\s*(?P<path>.+)$"),
+        re.compile(r'Merging formats into "(?P<path>.+)"$'),
+        re.compile(r"\[download\]\s+(?P<path>.+?) has already been downloaded"),
+    )
+
+    def __init__(self, command: str, db_service: Optional[DatabaseService] = None):
         self.command_name = command
         self.command_path = shutil.which(command)
+        self.db_service = db_service
 
     @property
     def is_available(self) -> bool:
         return self.command_path is not None
 
-    def run(self, url: str, title: str) -> Tuple[bool, str]:
-        """Runs the download command, returning success status and message."""
-        if not self.is_available: return False, f"Command '{self.command_name}' not found."
+    async def run(self, result: SearchResult,
+                  on_progress: Optional[Callable[[float, str, str], None]] = None) -> Tuple[bool, str]:
+        """Downloads one song, returning success status and message."""
+        progress = (lambda _, *args: on_progress(*args)) if on_progress else None
+        return (await self.run_batch([result], progress))[result.video_id]
+
+    async def run_batch(self, results: List[SearchResult],
+                        on_progress: Optional[Callable[[str, float, str, str], None]] = None,
+                        ) -> Dict[str, Tuple[bool, str]]:
+        """
+        Downloads several songs with one invocation of the download command,
+        returning (success, message) per video id. Output is read as it
+        arrives and attributed to whichever song it last mentioned, by video
+        id, URL number or quoted title; progress lines are reported as
+        (video_id, percent, speed, eta) and only the last few lines per song
+        are kept in memory. A song in a batch that the output never mentions
+        has no known outcome and counts as failed.
+        """
+        if not self.is_available:
+            return {r.video_id: (False, f"Command '{self.command_name}' not found.") for r in results}
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.command_path, *(r.link for r in results),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except Exception as e:
+            return {r.video_id: (False, f"An unexpected error occurred during the download of '{r.title}': {e}")
+                    for r in results}
+        video_ids = [r.video_id for r in results]
+        tails: Dict[str, Deque[str]] = {v: deque(maxlen=self.ERROR_TAIL_LINES) for v in video_ids}
+        # Output before any song is mentioned, shown for songs without an outcome.
+        unattributed: Deque[str] = deque(maxlen=self.ERROR_TAIL_LINES)
+        output_paths: Dict[str, str] = {}
+        failed: Set[str] = set()
+        # Songs in the order their output started; all but the last have finished.
+        # All output of a single-song run is that song's.
+        started = video_ids[:1] if len(results) == 1 else []
+
+        def mentioned_in(line: str) -> Optional[str]:
+            for r in results:
+                if r.video_id in line or f'"{r.title}"' in line:
+                    return r.video_id
+            url_match = self.URL_INDEX_RE.search(line)
+            if url_match and 1 <= int(url_match["index"]) <= len(results):
+                return video_ids[int(url_match["index"]) - 1]
+            return None
+
+        async def consume(stream: asyncio.StreamReader) -> None:
+            async for line in self._iter_lines(stream):
+                mentioned = mentioned_in(line)
+                if mentioned and (not started or mentioned != started[-1]):
+                    started.append(mentioned)
+                current = mentioned or (started[-1] if started else None)
+                if current is None:
+                    unattributed.append(line)
+                    continue
+                tails[current].append(line)
+                if self.ERROR_RE.search(line):
+                    failed.add(current)
+                for pattern in self.OUTPUT_PATH_RES:
+                    if path_match := pattern.search(line):
+                        output_paths[current] = path_match["path"]
+                match = self.PROGRESS_RE.search(line)
+                if match and on_progress:
+                    on_progress(current, float(match["percent"]), match["speed"] or "", match["eta"] or "")
+
         try:
-            process = subprocess.run([self.command_path, url], check=True, capture_output=True, text=True, encoding='utf-8')
-            return True, f"Download successful for '{title}'."
-        except subprocess.CalledProcessError as e: return False, f"Download failed for '{title}'. Details:\n{e.stderr}"
-        except Exception as e: return False, f"An unexpected error occurred during the download of '{title}': {e}"
+            await asyncio.gather(consume(process.stdout), consume(process.stderr))
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+            raise
+        if returncode != 0 and started:
+            # The song being processed when the command gave up did not finish.
+            failed.add(started[-1])
+        # Songs the output never mentioned were not reached, or their outcome is unknown.
+        failed.update(v for v in video_ids if v not in started)
+
+        outcomes = {}
+        for r in results:
+            success = r.video_id not in failed
+            if success:
+                outcomes[r.video_id] = (True, f"Download successful for '{r.title}'.")
+            else:
+                details = "\n".join(tails[r.video_id] or unattributed) or "No output mentioned this song."
+                outcomes[r.video_id] = (False, f"Download failed for '{r.title}'. Details:\n{details}")
+            self._record(r, success, output_paths.get(r.video_id), outcomes[r.video_id][1])
+        return outcomes
+
+    def close(self):
+        pass
+
+    def _record(self, result: SearchResult, success: bool, output_path: Optional[str], message: str):
+        if not self.db_service:
+            return
+        size_bytes = None
+        if output_path and os.path.isfile(output_path):
+            size_bytes = os.path.getsize(output_path)
+        self.db_service.queue_download_record(
+            result.video_id, "done" if success else "failed", output_path, size_bytes,
+            error=None if success else message,
+        )
+
+    @classmethod
+    async def _iter_lines(cls, stream: asyncio.StreamReader) -> AsyncIterator[str]:
+        """Splits output on both \\r and \\n; progress bars redraw with a bare \\r."""
+        pending = b""
+        while chunk := await stream.read(cls.READ_CHUNK_BYTES):
+            parts = re.split(rb"[\r\n]", pending + chunk)
+            pending = parts.pop()[-cls.MAX_LINE_BYTES:]
+            for part in parts:
+                if part.strip():
+                    yield part.decode("utf-8", errors="replace").strip()
+        if pending.strip():
+            yield pending.decode("utf-8", errors="replace").strip()
+
+
+class SearchCache:
+    """
+    Caches search results per normalized (query, filter, limit).
+    A small in-memory LRU answers repeated searches without touching SQLite;
+    behind it, the search_cache table keeps result order across restarts.
+    Both tiers expire entries after 'ttl_seconds'.
+    """
+    def __init__(self, db_service: DatabaseService, ttl_seconds: int, max_entries: int, memory_entries: int):
+        self.db_service = db_service
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, List[SearchResult]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, filter: str, limit: int) -> str:
+        """Case and whitespace differences in the query share one entry."""
+        return f"{' '.join(query.casefold().split())}\x1f{filter}\x1f{limit}"
+
+    def get(self, key: str) -> Optional[List[SearchResult]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > time.time() - self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return list(entry[1])
+                del self._memory[key]
+        cached = self.db_service.load_cached_search(key, self.ttl_seconds)
+        if cached is None:
+            return None
+        # Keep the stored age, so the entry expires from memory when it does on disk.
+        created_at, results = cached
+        self._remember(key, results, created_at=created_at)
+        return results
+
+    def put(self, key: str, results: List[SearchResult]):
+        self._remember(key, results, created_at=time.time())
+        self.db_service.queue_cached_search(key, [r.video_id for r in results], self.max_entries)
+
+    def _remember(self, key: str, results: List[SearchResult], created_at: float):
+        with self._lock:
+            self._memory[key] = (created_at, list(results))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
 
 
 class MusicSearchService:
-    """A service to handle interactions with the ytmusicapi."""
-    def __init__(self, db_service: DatabaseService):
+    """A service to run searches against a SearchBackend (YouTube Music by default)."""
+    # ytmusicapi search filters that return collections, and the kind each one yields.
+    COLLECTION_KINDS = {"albums": "album", "artists": "artist", "playlists": "playlist"}
+    # Threads shared by every search_many() call; higher concurrency is capped here.
+    SEARCH_MANY_MAX_WORKERS = 8
+
+    def __init__(self, db_service: DatabaseService, backend: Optional[SearchBackend] = None,
+                 cache: Optional[SearchCache] = None, limiter: Optional[TokenBucket] = None,
+                 retry: Optional[RetryPolicy] = None):
         self.db_service = db_service
+        self.backend = backend or YTMusicBackend()
+        self.cache = cache
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy()
+        # Long-lived, so its threads' pooled DB connections are reused across calls.
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def close(self):
+        """Releases the search threads and the backend's pooled HTTP connections."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
 
-    def search(self, query: str, limit: int) -> Tuple[Optional[List[SearchResult]], Optional[str]]:
+    def search(self, query: str, limit: int,
+               cache_results: bool = True) -> Tuple[Optional[List[SearchResult]], Optional[str]]:
         """Performs the search, saves results to DB, and returns them."""
         try:
-            ytmusic = YTMusic()
-            search_items = ytmusic.search(query=query, filter="songs", limit=limit)
-            
-            unique_results: dict[str, SearchResult] = {}
-            for item in search_items:
-                parsed_result = self._parse_item(item)
-                if parsed_result and parsed_result.video_id:
-                    unique_results[parsed_result.video_id] = parsed_result
-            
-            results = list(unique_results.values())
-            if results:
-                # This call is now thread-safe thanks to the changes in DatabaseService
-                self.db_service.save_results(results)
+            results, fetched = self._fetch(query, limit, cache_results=cache_results)
+            if fetched and results:
+                # The write happens on the DB writer thread, so results reach the UI first.
+                self.db_service.queue_results(results)
             return results, None
         except Exception:
             return None, traceback.format_exc()
 
-    def _parse_item(self, item: dict) -> Optional[SearchResult]:
-        """Parses a single raw API item into our SearchResult data model."""
-        if not item or "videoId" not in item:
+    def search_progressive(self, query: str, limit: int, first_page: int) -> Iterator[Tuple[Optional[List[SearchResult]], Optional[str]]]:
+        """
+        Yields (new results, error) in two steps: a quick first page of
+        'first_page' results, then the rest of the results up to 'limit'.
+        The backfill fetches the first page again, so the search is only
+        split when it at least doubles the results; otherwise, and for a
+        cached full result list, everything is yielded at once.
+        """
+        if self.cache:
+            cached = self.cache.get(SearchCache.make_key(query, "songs", limit))
+            if cached is not None:
+                yield cached, None
+                return
+        shown: List[SearchResult] = []
+        if limit >= 2 * first_page:
+            # Only the full list is cached; the first page is never looked up on its own.
+            shown, error = self.search(query, first_page, cache_results=False)
+            yield shown, error
+            if error:
+                return
+        # The backend pages through continuations itself, so the backfill
+        # asks for the full limit and only the unseen tail is yielded.
+        results, error = self.search(query, limit)
+        seen = {r.video_id for r in shown}
+        yield ([r for r in results if r.video_id not in seen] if results is not None else None), error
+
+    def search_many(self, queries: Iterable[str], limit: int, concurrency: int = 4,
+                    priority: int = BACKGROUND) -> SearchOutcomes:
+        """
+        Runs many searches with at most 'concurrency' in flight, yielding
+        (query, results, error) as each one finishes. Songs found by several
+        queries are saved once, in a single batched write at the end.
+        """
+        found: Dict[str, SearchResult] = {}
+        pool = self._search_pool()
+        pending = iter(queries)
+        futures: Dict[Future, str] = {}
+
+        def submit_next():
+            query = next(pending, None)
+            if query is not None:
+                futures[pool.submit(self._fetch, query, limit, priority)] = query
+
+        for _ in range(concurrency):
+            submit_next()
+        try:
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query = futures.pop(future)
+                    submit_next()
+                    try:
+                        results, fetched = future.result()
+                    except Exception:
+                        yield query, None, traceback.format_exc()
+                        continue
+                    if fetched:
+                        for r in results:
+                            found.setdefault(r.video_id, r)
+                    yield query, results, None
+        finally:
+            # Stopping the iteration early abandons the queries not yet started.
+            for future in futures:
+                future.cancel()
+            if found:
+                self.db_service.queue_results(list(found.values()))
+
+    def _search_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.SEARCH_MANY_MAX_WORKERS, thread_name_prefix="search")
+            return self._pool
+
+    def search_collections(self, query: str, filter: str, limit: int) -> Tuple[Optional[List[CollectionResult]], Optional[str]]:
+        """Searches for albums, artists or playlists ('filter' is the ytmusicapi filter name)."""
+        try:
+            kind = self.COLLECTION_KINDS[filter]
+            items = self.retry.call(lambda: self.backend.search(query, filter, limit), self.limiter, INTERACTIVE)
+            unique_results: dict[str, CollectionResult] = {}
+            for item in items:
+                parsed_result = self._parse_collection(item, kind)
+                if parsed_result:
+                    unique_results[parsed_result.browse_id] = parsed_result
+            return list(unique_results.values()), None
+        except Exception:
+            return None, traceback.format_exc()
+
+    def load_collection(self, collection: CollectionResult) -> Tuple[Optional[List[SearchResult]], Optional[str]]:
+        """
+        Returns the tracks of an album, artist or playlist. They are fetched
+        once and then served from the library, keyed by browse id.
+        """
+        try:
+            cached = self.db_service.load_collection_tracks(collection.browse_id)
+            if cached is not None:
+                return cached, None
+            items = self.retry.call(
+                lambda: self.backend.get_tracks(collection.kind, collection.browse_id), self.limiter, INTERACTIVE
+            )
+            tracks = parse_items(items)
+            self.db_service.queue_collection(collection, tracks)
+            return tracks, None
+        except Exception:
+            return None, traceback.format_exc()
+
+    def _fetch(self, query: str, limit: int, priority: int = INTERACTIVE,
+               cache_results: bool = True) -> Tuple[List[SearchResult], bool]:
+        """
+        Returns the results for a query, from the cache when possible, and
+        whether they were fetched from the network (and so are not saved yet).
+        """
+        cache_key = SearchCache.make_key(query, "songs", limit)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached, False
+        search_items = self.retry.call(
+            lambda: self.backend.search(query, "songs", limit), self.limiter, priority
+        )
+        results = parse_items(search_items)
+        if self.cache and cache_results:
+            self.cache.put(cache_key, results)
+        return results, True
+
+    def _parse_collection(self, item: dict, kind: str) -> Optional[CollectionResult]:
+        """Parses an album, artist or playlist search item."""
+        browse_id = item.get("browseId") if item else None
+        if not browse_id:
             return None
-            
-        duration_seconds = item.get("duration_seconds")
-        duration_formatted = "N/A"
-        if duration_seconds is not None:
-            minutes, seconds = divmod(duration_seconds, 60)
-            duration_formatted = f"{minutes:02d}:{seconds:02d}"
-        
-        album = item.get("album")
-        return SearchResult(
-            video_id=item["videoId"],
-            title=item.get("title", "N/A"),
-            artist=", ".join([a["name"] for a in item.get("artists", [])]) or "N/A",
-            album_name=album["name"] if album else "Single",
-            duration=duration_formatted,
-            link=f"https://music.youtube.com/watch?v={item['videoId']}",
-            is_explicit=item.get("isExplicit", False),
-        )
\ No newline at end of file
+        if kind == "album":
+            artists = ", ".join(a["name"] for a in item.get("artists") or []) or "N/A"
+            subtitle = f"{artists} · {item['year']}" if item.get("year") else artists
+            link = f"https://music.youtube.com/browse/{browse_id}"
+        elif kind == "artist":
+            subtitle = f"{item['subscribers']} subscribers" if item.get("subscribers") else "Artist"
+            link = f"https://music.youtube.com/channel/{browse_id}"
+        else:
+            subtitle = item.get("author") or "N/A"
+            link = f"https://music.youtube.com/playlist?list={browse_id.removeprefix('VL')}"
+        return CollectionResult(
+            browse_id=browse_id,
+            kind=kind,
+            title=item.get("title") or item.get("artist") or "N/A",
+            subtitle=subtitle,
+            link=link,
+        )
@@ -0,0 +1,133 @@
+# throttle.py
+"""
+Pacing and retries for calls to the remote search backend.
+
+A single TokenBucket is shared by every caller so bursts from the UI and
+from batch jobs together stay under the rate the backend tolerates.
+RetryPolicy retries transient failures with jittered exponential backoff.
+"""
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+import requests
+
+# Priority classes: lower values are served first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# HTTP statuses worth retrying: timeouts, throttling and server-side errors.
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled at 'rate' tokens per second, holding
+    at most 'capacity'. Waiting callers are served strictly by priority,
+    then in arrival order, so interactive searches overtake queued
+    background work.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._waiters: list = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """Takes one token, waiting for it if needed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        wait = (1 - self._tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+@dataclass
+class RetryPolicy:
+    """Retries transient failures with full-jitter exponential backoff."""
+    attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def call(self, fn: Callable[[], T], limiter: Optional[TokenBucket] = None,
+             priority: int = INTERACTIVE) -> T:
+        """
+        Calls 'fn', taking a token from 'limiter' before every attempt.
+        'attempts' counts the first call, so 0 or 1 means no retries.
+        """
+        attempts = max(1, self.attempts)
+        for attempt in range(attempts):
+            if limiter is not None:
+                limiter.acquire(priority)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == attempts - 1 or not is_transient(e):
+                    raise
+                time.sleep(self._delay(attempt, e))
+        raise AssertionError("unreachable")
+
+    def _delay(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def is_transient(error: Exception) -> bool:
+    """True for network hiccups, timeouts, throttling and 5xx responses."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+    status = _status_code(error)
+    return status in TRANSIENT_STATUSES
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return response.status_code
+    # ytmusicapi reports server errors as "Server returned HTTP 503: ...".
+    match = re.search(r"\bHTTP (\d{3})\b", str(error))
+    return int(match.group(1)) if match else None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
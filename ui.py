@@ -1,23 +1,38 @@
 # ui.py
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from textual.app import ComposeResult
 from textual.message import Message
+from textual.timer import Timer
 from textual.widgets import (Button, DataTable, Input, Label, Markdown, RichLog,
-                             Static)
+                             Select, Static)
 
-from models import SearchResult
+from models import CollectionResult, DownloadJob, ResultItem, format_duration
 
 class SearchControls(Static):
-    """Widget for the search input and button."""
+    """
+    Widget for the search input and button. When 'debounce_seconds' is set,
+    it also searches as the user types, once typing pauses for that long.
+    """
     class SearchRequested(Message):
-        def __init__(self, query: str) -> None: 
+        def __init__(self, query: str, incremental: bool = False, kind: str = "songs") -> None: 
             self.query = query
+            self.incremental = incremental
+            self.kind = kind
             super().__init__()
 
+    KINDS = [("Songs", "songs"), ("Albums", "albums"), ("Artists", "artists"), ("Playlists", "playlists")]
+
+    def __init__(self, debounce_seconds: Optional[float] = None, min_chars: int = 3, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.debounce_seconds = debounce_seconds
+        self.min_chars = min_chars
+        self._debounce_timer: Optional[Timer] = None
+
     def compose(self) -> ComposeResult:
         yield Label("Enter search terms:")
         yield Input(id="search-input")
+        yield Select(self.KINDS, value="songs", allow_blank=False, id="search-kind")
         yield Button("Search", variant="primary")
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
@@ -26,10 +41,25 @@ class SearchControls(Static):
     def on_input_submitted(self, event: Input.Submitted) -> None:
         self.post_search_message()
 
-    def post_search_message(self) -> None:
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if self.debounce_seconds is None:
+            return
+        self._cancel_debounce()
+        if len(event.value.strip()) >= self.min_chars:
+            self._debounce_timer = self.set_timer(
+                self.debounce_seconds, lambda: self.post_search_message(incremental=True)
+            )
+
+    def post_search_message(self, incremental: bool = False) -> None:
+        self._cancel_debounce()
         query = self.query_one(Input).value.strip()
         if query:
-            self.post_message(self.SearchRequested(query))
+            self.post_message(self.SearchRequested(query, incremental, self.query_one(Select).value))
+
+    def _cancel_debounce(self) -> None:
+        if self._debounce_timer is not None:
+            self._debounce_timer.stop()
+            self._debounce_timer = None
 
 
 class DetailsPane(Static):
@@ -37,9 +67,11 @@ class DetailsPane(Static):
     def on_mount(self) -> None:
         self.update_details(None)
 
-    def update_details(self, result: Optional[SearchResult]) -> None:
-        if result:
-            content = f"## {result.title}\n\n- **Artist**: {result.artist}\n- **Album**: {result.album_name}\n- **Duration**: {result.duration}\n- **Explicit**: {'Yes' if result.is_explicit else 'No'}\n- **Link**: `{result.link}`"
+    def update_details(self, result: Optional[ResultItem]) -> None:
+        if isinstance(result, CollectionResult):
+            content = f"## {result.title}\n\n- **Type**: {result.kind.title()}\n- **By**: {result.subtitle}\n- **Link**: `{result.link}`\n\n*Press Enter to show or hide its tracks.*"
+        elif result:
+            content = f"## {result.title}\n\n- **Artist**: {result.artist}\n- **Album**: {result.album_name}\n- **Duration**: {format_duration(result.duration_seconds)}\n- **Explicit**: {'Yes' if result.is_explicit else 'No'}\n- **Link**: `{result.link}`"
         else:
             content = "## Details\n\n*Select a song to see its details.*"
         self.query_one(Markdown).update(content)
@@ -60,7 +92,20 @@ class ResultsDisplay(DataTable):
             self.key = key
             super().__init__()
 
+    class EndReached(Message):
+        """Posted when the cursor gets close to the last loaded row."""
+
+    # How many rows before the end the cursor may get before more are requested.
+    PREFETCH_MARGIN = 10
+
+    DOWNLOADED_MARKER = "✔"
+
+    # Video ids marked as already downloaded.
+    downloaded: Set[str]
+
     def on_mount(self) -> None:
+        self.downloaded = set()
+        self.add_column(self.DOWNLOADED_MARKER, key="downloaded", width=1)
         self.add_columns("Title", "Artist", "Album")
         self.cursor_type = "row"
 
@@ -68,14 +113,71 @@ class ResultsDisplay(DataTable):
         if event.row_key.value:
             self.post_message(self.RowSelected(event.row_key.value))
 
+    highlighted_key: Optional[str] = None
+
     def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        self.highlighted_key = event.row_key.value
         self.post_message(self.RowHighlighted(event.row_key.value))
+        if event.cursor_row >= self.row_count - self.PREFETCH_MARGIN:
+            self.post_message(self.EndReached())
 
-    def update_results(self, results: List[SearchResult]) -> None:
+    def update_results(self, results: List[ResultItem], focus: bool = True) -> None:
+        """Replaces all rows, keeping the cursor on the highlighted item if it is still listed."""
+        highlighted = self.highlighted_key
         self.clear()
+        self.append_results(results)
+        row = next((i for i, r in enumerate(results) if r.key == highlighted), None)
+        if row is not None:
+            self.move_cursor(row=row, animate=False)
+        if focus:
+            self.focus()
+
+    def append_results(self, results: List[ResultItem]) -> None:
+        """Adds rows below the existing ones without moving the cursor."""
         for r in results:
-            self.add_row(r.title, r.artist, r.album_name, key=r.video_id)
-        self.focus()
+            if isinstance(r, CollectionResult):
+                self.add_row("", f"▸ {r.title}", r.subtitle, r.kind.title(), key=r.browse_id)
+            else:
+                marker = self.DOWNLOADED_MARKER if r.video_id in self.downloaded else ""
+                self.add_row(marker, r.title, r.artist, r.album_name, key=r.video_id)
+
+    def mark_downloaded(self, video_id: str) -> None:
+        self.downloaded.add(video_id)
+        if video_id in self.rows:
+            self.update_cell(video_id, "downloaded", self.DOWNLOADED_MARKER)
+
+
+class DownloadQueuePane(DataTable):
+    """Widget listing queued, running and finished downloads."""
+    STATE_LABELS = {
+        "queued": "⏳ Queued",
+        "running": "📥 Downloading",
+        "done": "[green]✅ Done[/green]",
+        "failed": "[red]❌ Failed[/red]",
+    }
+
+    def on_mount(self) -> None:
+        self.add_column("Title", key="title")
+        self.add_column("State", key="state")
+        self.add_column("Progress", key="progress")
+        self.cursor_type = "none"
+
+    def update_job(self, job: DownloadJob) -> None:
+        key = job.result.video_id
+        state = self.STATE_LABELS[job.state]
+        progress = self._format_progress(job)
+        if key in self.rows:
+            self.update_cell(key, "state", state)
+            self.update_cell(key, "progress", progress)
+        else:
+            self.add_row(job.result.title, state, progress, key=key)
+
+    @staticmethod
+    def _format_progress(job: DownloadJob) -> str:
+        if job.state != "running" or job.progress is None:
+            return ""
+        parts = [f"{job.progress:.0f}%", job.speed, f"ETA {job.eta}" if job.eta else ""]
+        return " ".join(p for p in parts if p)
 
 
 class LogPane(RichLog):